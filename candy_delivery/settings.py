@@ -55,6 +55,9 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'candy_delivery.urls'
 
+# Tests run with in-memory caches only
+TEST_RUNNER = 'candy_delivery.test_runner.TestRunner'
+
 """
 TEMPLATES = [
     {
@@ -128,3 +131,98 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.1/howto/static-files/
 
 STATIC_URL = '/static/'
+
+
+# Orders assignment
+# Packing strategy: 'greedy', 'knapsack', 'region_clustered' or 'oldest_first'
+# (compare them with python manage.py benchmark_assignment). 'knapsack'
+# maximizes the weight of a delivery within the time budget (seconds) and
+# falls back to 'greedy' when it runs out
+
+CANDY_DELIVERY_PACKER = 'knapsack'
+
+CANDY_DELIVERY_PACKER_TIME_BUDGET = 0.05
+
+CANDY_DELIVERY_PACKER_MAX_CANDIDATES = 2000
+
+# Per-process in-memory index of free orders. Every process checks a
+# version row before using its index; writes that bypass the service
+# API (e.g. manual SQL) must not be made while it is enabled
+
+CANDY_DELIVERY_FREE_ORDER_INDEX = False
+
+# Confirm deliveries precomputed by the background planner
+# (python manage.py plan_deliveries --interval 1) on /orders/assign
+
+CANDY_DELIVERY_RESERVATIONS = False
+
+# Imports: every request is written in one transaction. For very large
+# batches a commit can be made every CANDY_DELIVERY_IMPORT_COMMIT_SIZE
+# objects instead (None - one commit per request); a failed write then
+# keeps the chunks committed before it. This also applies to streamed
+# imports, where invalid data found later in the stream likewise keeps
+# the chunks committed before it (the response is still 400)
+
+CANDY_DELIVERY_IMPORT_COMMIT_SIZE = None
+
+# Run every request handler inside one transaction
+
+CANDY_DELIVERY_ATOMIC_HANDLERS = False
+
+# Imports with a body larger than this many bytes (or of unknown size) are
+# parsed, validated and written incrementally, so worker memory does not
+# grow with the payload; such an import always uses one transaction
+# (None - always parse the whole body at once)
+
+CANDY_DELIVERY_STREAMING_IMPORT_THRESHOLD = 1048576
+
+# Asynchronous import jobs (?async=1) with at least this many items are
+# validated by process_imports in one long-lived pool of forked processes
+# (None - always validate in the worker process). The pool size is
+# CANDY_DELIVERY_VALIDATION_PROCESSES (None - number of CPU cores; no pool
+# with fewer than 2). Synchronous HTTP imports always validate in the
+# request process, as forking a multithreaded WSGI worker is unsafe
+
+CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD = 20000
+
+CANDY_DELIVERY_VALIDATION_PROCESSES = None
+
+# Asynchronous import jobs whose worker has not reported progress (every
+# validated batch and every committed chunk) for this many seconds (the
+# worker died) are marked failed by process_imports before it takes new
+# jobs; they are not re-queued, as a job that committed some chunks
+# (CANDY_DELIVERY_IMPORT_COMMIT_SIZE) cannot be safely repeated. A worker
+# that finishes a job already marked failed keeps the failed status
+
+CANDY_DELIVERY_IMPORT_JOB_TIMEOUT = 3600
+
+# Validation of imported items: 'schema' - single-pass declarative
+# schema of the payload, 'model' - full_clean of every model object
+# (compare them with python manage.py benchmark_validation)
+
+CANDY_DELIVERY_IMPORT_VALIDATOR = 'schema'
+
+# Responses of GET /couriers/<id> can be cached in the CACHES alias
+# CANDY_DELIVERY_COURIER_INFO_CACHE (None - no caching, the default) for
+# CANDY_DELIVERY_COURIER_INFO_CACHE_TIMEOUT seconds; a cached response is
+# dropped as soon as the courier, its deliveries or its statistics change.
+# The cache must be shared by every process that changes couriers (WSGI
+# processes, process_imports), so the locmem alias below only suits a
+# deployment where they all are one process; otherwise use memcached.
+# The file backend is not recommended: it stores pickles (its LOCATION must
+# be a directory writable only by the service user, outside the project
+# tree) and lists the whole directory on every write
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'courier_info': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'courier_info',
+    },
+}
+
+CANDY_DELIVERY_COURIER_INFO_CACHE = None
+
+CANDY_DELIVERY_COURIER_INFO_CACHE_TIMEOUT = 300
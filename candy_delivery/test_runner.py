@@ -0,0 +1,48 @@
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'TestRunner',
+]
+
+
+# =====================================================================================================================
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Запуск тестов с кэшами в памяти процесса (тесты не затрагивают
+    кэши, настроенные для сервиса, в том числе файловые)
+    """
+
+    # Кэши на время тестов
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
+        'courier_info': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'courier_info_test',
+        },
+    }
+
+    def setup_test_environment(self, **kwargs):
+        """
+        Подготовка окружения тестов
+        :param kwargs: параметры родительского класса
+        """
+        super().setup_test_environment(**kwargs)
+        self.__caches_override = override_settings(CACHES=self.CACHES)
+        self.__caches_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        """
+        Восстановление окружения после тестов
+        :param kwargs: параметры родительского класса
+        """
+        self.__caches_override.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,9 @@
+from .errors import *
+from .greedy_packer import *
+from .knapsack_packer import *
+from .oldest_first_packer import *
+from .region_clustered_packer import *
+from .free_order_pool import *
+from .free_order_index import *
+from .packer_factory import *
+from .delivery_planner import *
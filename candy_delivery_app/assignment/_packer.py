@@ -0,0 +1,109 @@
+import abc
+from decimal import Decimal
+from itertools import islice, takewhile
+from django.conf import settings
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'Packer',
+    'WindowPacker',
+]
+
+
+# =====================================================================================================================
+
+
+class Packer(abc.ABC):
+    """
+    Алгоритм (стратегия) упаковки заказов в развоз
+    """
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создание алгоритма с параметрами из настроек
+        :return Packer: алгоритм упаковки
+        """
+        return cls()
+
+    @abc.abstractmethod
+    def pack(self, candidates, max_weight):
+        """
+        Выбор заказов для развоза
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса (перебираются лениво)
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы (в порядке кандидатов)
+        """
+        pass
+
+
+# =====================================================================================================================
+
+
+class WindowPacker(Packer, abc.ABC):
+    """
+    Алгоритм упаковки, рассматривающий ограниченное
+    число самых легких заказов-кандидатов
+    """
+
+    def __init__(self, max_candidates=2000):
+        """
+        Инициализация
+        :param int max_candidates: максимальное число
+            рассматриваемых заказов-кандидатов
+        """
+        self.max_candidates = max_candidates
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создание алгоритма с параметрами из настроек
+        :return Packer: алгоритм упаковки
+        """
+        return cls(max_candidates=getattr(
+            settings, 'CANDY_DELIVERY_PACKER_MAX_CANDIDATES', 2000))
+
+    def _window(self, candidates, max_weight):
+        """
+        Ограничение перебора кандидатов: не более max_candidates заказов,
+        чтение прекращается на первом заказе тяжелее max_weight (кандидаты
+        упорядочены по весу - следующие заказы тоже не поместятся)
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса
+        :param Decimal max_weight: максимальный вес развоза
+        :return: итератор заказов
+        """
+        return islice(
+            takewhile(lambda o: o.weight <= max_weight, candidates),
+            self.max_candidates,
+        )
+
+    @staticmethod
+    def _first_fit(orders, max_weight):
+        """
+        Выбор заказов в заданном порядке: заказ берется,
+        если он помещается в развоз вместе с уже выбранными
+        :param list(models.Order) orders: заказы
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы
+        """
+        selected = list()
+        total_weight = Decimal('0.00')
+        for order in orders:
+            if total_weight + order.weight <= max_weight:
+                total_weight += order.weight
+                selected.append(order)
+        return selected
+
+    @staticmethod
+    def _order_key(order):
+        """
+        Ключ упорядочивания заказов-кандидатов
+        :param models.Order order: заказ
+        :return tuple: (вес, id)
+        """
+        return order.weight, order.id
@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from .free_order_pool import FreeOrderPool
+from .packer_factory import create_packer
+from ..wrappers import CourierWrapper, OrderWrapper
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'DeliveryPlanner',
+]
+
+
+# =====================================================================================================================
+
+
+class DeliveryPlanner:
+    """
+    Планировщик следующих развозов: для каждого курьера без
+    незавершенного развоза резервирует заказы заранее, так что
+    назначение сводится к подтверждению резерва
+    """
+
+    @staticmethod
+    def enabled():
+        """
+        Признак использования резервов (CANDY_DELIVERY_RESERVATIONS)
+        :return bool: True, если резервы используются
+        """
+        return getattr(settings, 'CANDY_DELIVERY_RESERVATIONS', False)
+
+    def plan(self):
+        """
+        Пересчет всех резервов за один проход по пулу свободных заказов:
+        заказы подбираются вне транзакции (без блокировок), резерв
+        каждого курьера заменяется отдельной короткой транзакцией,
+        резервы предыдущих проходов, не замененные в этом, удаляются
+        :return int: число зарезервированных заказов
+        """
+        generation = (models.Reservation.objects.aggregate(
+            generation=Max('generation'))['generation'] or 0) + 1
+
+        courier_wrappers = CourierWrapper.select_list(
+            models.Courier.objects.exclude(
+                delivery__is_complete=False).order_by('id')
+        )
+        n_reserved = 0
+        if len(courier_wrappers) > 0:
+            packer = create_packer()
+            pool = FreeOrderPool.select(courier_wrappers)
+            for cw in courier_wrappers:
+                orders = packer.pack(pool.candidates(cw), cw.object_.max_weight)
+                pool.take(orders)
+                n_reserved += self.__reserve(cw, [o.id for o in orders], generation)
+
+        models.Reservation.objects.filter(generation__lt=generation).delete()
+        return n_reserved
+
+    @staticmethod
+    def __reserve(courier_wrapper, order_ids, generation):
+        """
+        Замена резерва курьера (заказы, назначенные после подбора,
+        в резерв не попадают)
+        :param CourierWrapper courier_wrapper: данные по курьеру
+        :param list(int) order_ids: id подобранных заказов
+        :param int generation: номер прохода планировщика
+        :return int: число зарезервированных заказов
+        """
+        with transaction.atomic():
+            reservation, _ = models.Reservation.objects.update_or_create(
+                courier=courier_wrapper.object_,
+                defaults={'generation': generation, 'create_time': timezone.now()},
+            )
+            reservation.order_set.exclude(id__in=order_ids).update(reservation=None)
+            if len(order_ids) == 0:
+                return 0
+            return models.Order.objects.filter(
+                id__in=order_ids, delivery=None
+            ).update(reservation=reservation)
+
+    @staticmethod
+    def confirm(courier_wrapper):
+        """
+        Получение заказов из резерва курьера (резерв удаляется)
+        :param CourierWrapper courier_wrapper: данные по курьеру
+        :return list(models.Order) | None: заказы по возрастанию
+            веса (None, если резерва нет, он устарел или его
+            в этот момент заменяет планировщик - тогда заказы
+            подбираются без резерва, ожидания планировщика нет)
+        """
+        reservations = models.Reservation.objects.filter(
+            courier=courier_wrapper.object_)
+        if connection.features.has_select_for_update_skip_locked:
+            reservations = reservations.select_for_update(skip_locked=True)
+        else:
+            reservations = reservations.select_for_update()
+        reservation = reservations.first()
+        if reservation is None:
+            return None
+
+        order_wrappers = OrderWrapper.select_list(
+            reservation.order_set.order_by('weight', 'id'))
+        reservation.delete()
+        if sum(ow.object_.weight for ow in order_wrappers) > \
+                courier_wrapper.object_.max_weight:
+            return None
+        for ow in order_wrappers:
+            if ow.object_.delivery_id is not None or \
+                    not courier_wrapper.test_order(ow):
+                return None
+        return [ow.object_ for ow in order_wrappers]
@@ -0,0 +1,14 @@
+__all__ = [
+    'OrdersAlreadyAssignedError',
+]
+
+
+# =====================================================================================================================
+
+
+class OrdersAlreadyAssignedError(Exception):
+    """
+    Ошибка назначения: часть выбранных заказов уже назначена
+    (выбор сделан по устаревшим данным - индексу или резерву)
+    """
+    pass
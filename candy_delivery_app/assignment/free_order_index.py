@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import transaction
+from .free_order_pool import FreeOrderPool
+from ..wrappers import OrderWrapper
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'FreeOrderIndex',
+    'free_order_index',
+]
+
+
+# =====================================================================================================================
+
+
+class FreeOrderIndex:
+    """
+    Индекс свободных заказов в памяти процесса: назначенные заказы
+    исключаются из индекса без смены версии набора данных в БД;
+    версия меняется только при внешних изменениях (загрузка заказов,
+    освобождение заказов при изменении курьера), а заказы, назначенные
+    другими процессами, обнаруживаются при записи развоза (release)
+    """
+
+    # Имя набора данных (для DataVersion)
+    VERSION_NAME = 'free_orders'
+
+    def __init__(self):
+        """
+        Инициализация
+        """
+        self._lock = threading.Lock()
+        self._pool = None
+        self._version = None
+
+    @property
+    def enabled(self):
+        """
+        Признак использования индекса (CANDY_DELIVERY_FREE_ORDER_INDEX)
+        :return bool: True, если индекс используется
+        """
+        return getattr(settings, 'CANDY_DELIVERY_FREE_ORDER_INDEX', False)
+
+    def select(self, courier_wrappers, packer):
+        """
+        Выбор заказов для новых развозов; выбранные заказы
+        исключаются из индекса (если записать развоз не удалось,
+        заказы нужно вернуть методом release; транзакция назначения
+        выполняется через atomic, чтобы при ее откате сбросить индекс)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :param Packer packer: алгоритм упаковки заказов
+        :return dict(int, list(models.Order)): заказы по id курьеров
+        """
+        with self._lock:
+            version = models.DataVersion.get_version(self.VERSION_NAME)
+            if self._pool is None or version is None or version != self._version:
+                self._pool = FreeOrderPool(OrderWrapper.select_list(
+                    models.Order.objects.filter(delivery=None)))
+                self._version = version
+
+            orders = dict()
+            for cw in courier_wrappers:
+                orders[cw.object_.id] = packer.pack(
+                    self._pool.candidates(cw), cw.object_.max_weight)
+                self._pool.take(orders[cw.object_.id])
+            return orders
+
+    def take(self, orders):
+        """
+        Исключение из индекса заказов, назначенных в обход индекса
+        (после фиксации текущей транзакции - при откате заказы
+        остаются в индексе)
+        :param list(models.Order) orders: назначенные заказы
+        """
+        def take():
+            with self._lock:
+                if self._pool is not None:
+                    self._pool.take(orders)
+
+        if len(orders) > 0:
+            transaction.on_commit(take)
+
+    def release(self, orders):
+        """
+        Возврат в индекс заказов, развоз для которых записать
+        не удалось (заказы, уже назначенные другими процессами,
+        исключаются из индекса)
+        :param list(models.Order) orders: выбранные заказы
+        """
+        if len(orders) == 0:
+            return
+        free_orders = OrderWrapper.select_list(models.Order.objects.filter(
+            id__in=[o.id for o in orders], delivery=None))
+        with self._lock:
+            if self._pool is not None:
+                self._pool.put(free_orders)
+
+    @contextmanager
+    def atomic(self):
+        """
+        Транзакция назначения заказов: если она прервана исключением,
+        индекс сбрасывается (заказы, исключенные из индекса методом
+        select в этой транзакции, вернутся при его перезагрузке)
+        """
+        try:
+            with transaction.atomic():
+                yield
+        except Exception:
+            if self.enabled:
+                self.invalidate()
+            raise
+
+    def invalidate(self):
+        """
+        Сброс индекса
+        """
+        with self._lock:
+            self._pool = None
+            self._version = None
+
+    @classmethod
+    def notify_changed(cls):
+        """
+        Уведомление об изменении набора свободных заказов
+        (смена версии - индексы всех процессов будут перезагружены)
+        """
+        if getattr(settings, 'CANDY_DELIVERY_FREE_ORDER_INDEX', False):
+            models.DataVersion.bump(cls.VERSION_NAME)
+
+
+# =====================================================================================================================
+
+
+# Индекс свободных заказов текущего процесса
+free_order_index = FreeOrderIndex()
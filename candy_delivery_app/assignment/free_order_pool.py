@@ -0,0 +1,100 @@
+import heapq
+from bisect import bisect_left
+from ..wrappers import CourierWrapper, OrderWrapper
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'FreeOrderPool',
+]
+
+
+# =====================================================================================================================
+
+
+class FreeOrderPool:
+    """
+    Пул свободных заказов, проиндексированный по районам
+    (в каждом районе заказы упорядочены по весу и id)
+    """
+
+    def __init__(self, order_wrappers):
+        """
+        Инициализация
+        :param list(OrderWrapper) order_wrappers: свободные заказы
+            (с загруженными часами доставки)
+        """
+        self._regions = dict()
+        self._keys = dict()
+        for ow in sorted(order_wrappers, key=FreeOrderPool._order_key):
+            self._regions.setdefault(ow.object_.region, list()).append(ow)
+            self._keys.setdefault(ow.object_.region, list()).append(
+                FreeOrderPool._order_key(ow))
+
+    @classmethod
+    def select(cls, courier_wrappers):
+        """
+        Загрузка из БД свободных заказов, подходящих курьерам
+        (без блокировок - выбранные заказы блокируются отдельно)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return FreeOrderPool: пул заказов
+        """
+        return cls(OrderWrapper.select_list(
+            CourierWrapper.select_common_candidate_orders(courier_wrappers)))
+
+    def candidates(self, courier_wrapper):
+        """
+        Перебор свободных заказов, подходящих курьеру
+        по району, часам доставки и весу
+        :param CourierWrapper courier_wrapper: данные по курьеру
+        :return: генератор заказов (models.Order) по возрастанию веса
+        """
+        max_weight = courier_wrapper.object_.max_weight
+        working_hours_mask = courier_wrapper.working_hours_mask
+        regions = [
+            self._regions[region] for region in courier_wrapper.region_set
+            if region in self._regions
+        ]
+        for ow in heapq.merge(*regions, key=FreeOrderPool._order_key):
+            if ow.object_.weight > max_weight:
+                return
+            if working_hours_mask & ow.delivery_hours_mask:
+                yield ow.object_
+
+    def take(self, orders):
+        """
+        Исключение назначенных заказов из пула
+        :param list(models.Order) orders: назначенные заказы
+        """
+        for order in orders:
+            keys = self._keys.get(order.region, list())
+            i = bisect_left(keys, (order.weight, order.id))
+            if i < len(keys) and keys[i] == (order.weight, order.id):
+                del keys[i]
+                del self._regions[order.region][i]
+
+    def put(self, order_wrappers):
+        """
+        Возврат заказов в пул (заказы, уже находящиеся в пуле, пропускаются)
+        :param list(OrderWrapper) order_wrappers: заказы
+            (с загруженными часами доставки)
+        """
+        for ow in order_wrappers:
+            key = FreeOrderPool._order_key(ow)
+            keys = self._keys.setdefault(ow.object_.region, list())
+            i = bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                continue
+            keys.insert(i, key)
+            self._regions.setdefault(ow.object_.region, list()).insert(i, ow)
+
+    @staticmethod
+    def _order_key(order_wrapper):
+        """
+        Ключ упорядочивания заказов
+        :param OrderWrapper order_wrapper: заказ
+        :return tuple: (вес, id)
+        """
+        return order_wrapper.object_.weight, order_wrapper.object_.id
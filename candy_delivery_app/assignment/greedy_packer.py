@@ -0,0 +1,37 @@
+from decimal import Decimal
+from ._packer import Packer
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'GreedyPacker',
+]
+
+
+# =====================================================================================================================
+
+
+class GreedyPacker(Packer):
+    """
+    Жадная упаковка: заказы берутся по возрастанию веса
+    до первого заказа, который не помещается в развоз
+    """
+
+    def pack(self, candidates, max_weight):
+        """
+        Выбор заказов для развоза
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса (перебираются лениво)
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы (в порядке кандидатов)
+        """
+        orders = list()
+        total_weight = Decimal('0.00')
+        for order in candidates:
+            total_weight += order.weight
+            if total_weight > max_weight:
+                break
+            orders.append(order)
+        return orders
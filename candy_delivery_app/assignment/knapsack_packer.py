@@ -0,0 +1,99 @@
+import time
+from django.conf import settings
+from ._packer import WindowPacker
+from .greedy_packer import GreedyPacker
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'KnapsackPacker',
+]
+
+
+# =====================================================================================================================
+
+
+class KnapsackPacker(WindowPacker):
+    """
+    Упаковка с максимизацией суммарного веса развоза
+    (задача о сумме подмножеств на целых весах в сотых долях кг);
+    при превышении лимита времени используется жадная упаковка
+    """
+
+    def __init__(self, time_budget=0.05, max_candidates=2000):
+        """
+        Инициализация
+        :param float time_budget: лимит времени на решение (с)
+        :param int max_candidates: максимальное число
+            рассматриваемых заказов-кандидатов
+        """
+        super().__init__(max_candidates)
+        self.time_budget = time_budget
+
+    @classmethod
+    def from_settings(cls):
+        """
+        Создание алгоритма с параметрами из настроек
+        :return Packer: алгоритм упаковки
+        """
+        return cls(
+            time_budget=getattr(
+                settings, 'CANDY_DELIVERY_PACKER_TIME_BUDGET', 0.05),
+            max_candidates=getattr(
+                settings, 'CANDY_DELIVERY_PACKER_MAX_CANDIDATES', 2000),
+        )
+
+    def pack(self, candidates, max_weight):
+        """
+        Выбор заказов для развоза
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса (перебираются лениво)
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы (в порядке кандидатов)
+        """
+        deadline = time.perf_counter() + self.time_budget
+        candidates = list(self._window(candidates, max_weight))
+        greedy_orders = GreedyPacker().pack(candidates, max_weight)
+        if len(greedy_orders) == len(candidates):
+            return greedy_orders
+
+        capacity = self.__to_centigrams(max_weight)
+        weights = [self.__to_centigrams(o.weight) for o in candidates]
+        greedy_weight = sum(weights[:len(greedy_orders)])
+        if greedy_weight == capacity:
+            return greedy_orders
+
+        # Множество достижимых сумм - биты целого числа
+        capacity_mask = (1 << (capacity + 1)) - 1
+        reachable = 1
+        history = list()
+        for weight in weights:
+            if time.perf_counter() > deadline:
+                return greedy_orders
+            history.append(reachable)
+            reachable |= (reachable << weight) & capacity_mask
+
+        best_weight = reachable.bit_length() - 1
+        if best_weight <= greedy_weight:
+            return greedy_orders
+
+        # Восстановление подмножества: заказ i нужен, если сумма
+        # недостижима без него (предпочитаются более легкие заказы)
+        selected = list()
+        for i in range(len(weights) - 1, -1, -1):
+            if not (history[i] >> best_weight) & 1:
+                selected.append(candidates[i])
+                best_weight -= weights[i]
+        selected.reverse()
+        return selected
+
+    @staticmethod
+    def __to_centigrams(weight):
+        """
+        Перевод веса в целое число сотых долей кг
+        :param Decimal weight: вес (кг)
+        :return int: вес (сотые доли кг)
+        """
+        return int(weight * 100)
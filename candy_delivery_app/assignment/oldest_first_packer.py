@@ -0,0 +1,34 @@
+from ._packer import WindowPacker
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'OldestFirstPacker',
+]
+
+
+# =====================================================================================================================
+
+
+class OldestFirstPacker(WindowPacker):
+    """
+    Упаковка с приоритетом давно созданных заказов:
+    заказы берутся в порядке создания, пока помещаются в развоз
+    """
+
+    def pack(self, candidates, max_weight):
+        """
+        Выбор заказов для развоза
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса (перебираются лениво)
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы (в порядке кандидатов)
+        """
+        candidates = sorted(
+            self._window(candidates, max_weight),
+            key=lambda o: (o.create_time, o.id)
+        )
+        return sorted(
+            self._first_fit(candidates, max_weight), key=self._order_key)
@@ -0,0 +1,51 @@
+from django.conf import settings
+from .greedy_packer import GreedyPacker
+from .knapsack_packer import KnapsackPacker
+from .oldest_first_packer import OldestFirstPacker
+from .region_clustered_packer import RegionClusteredPacker
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'PACKERS',
+    'register_packer',
+    'create_packer',
+]
+
+
+# =====================================================================================================================
+
+
+# Зарегистрированные алгоритмы (стратегии) упаковки заказов
+PACKERS = {
+    'greedy': GreedyPacker,
+    'knapsack': KnapsackPacker,
+    'region_clustered': RegionClusteredPacker,
+    'oldest_first': OldestFirstPacker,
+}
+
+
+def register_packer(name, packer_type):
+    """
+    Регистрация алгоритма упаковки заказов
+    :param str name: имя алгоритма (значение CANDY_DELIVERY_PACKER)
+    :param type packer_type: класс алгоритма (наследник Packer)
+    """
+    PACKERS[name] = packer_type
+
+
+def create_packer(name=None):
+    """
+    Создание алгоритма упаковки заказов
+    :param str | None name: имя алгоритма (по умолчанию
+        используется заданный в настройках CANDY_DELIVERY_PACKER)
+    :return Packer: алгоритм упаковки
+    """
+    if name is None:
+        name = getattr(settings, 'CANDY_DELIVERY_PACKER', 'knapsack')
+    try:
+        return PACKERS[name].from_settings()
+    except KeyError:
+        raise ValueError('Unknown packer: "{0}"'.format(name)) from None
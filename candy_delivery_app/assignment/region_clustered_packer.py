@@ -0,0 +1,42 @@
+from ._packer import WindowPacker
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'RegionClusteredPacker',
+]
+
+
+# =====================================================================================================================
+
+
+class RegionClusteredPacker(WindowPacker):
+    """
+    Упаковка с группировкой по районам: развоз заполняется заказами
+    района, дающего наибольший вес, затем следующего района и т.д.
+    (меньше переездов между районами за один развоз)
+    """
+
+    def pack(self, candidates, max_weight):
+        """
+        Выбор заказов для развоза
+        :param iterable(models.Order) candidates: заказы-кандидаты,
+            упорядоченные по возрастанию веса (перебираются лениво)
+        :param Decimal max_weight: максимальный вес развоза
+        :return list(models.Order): выбранные заказы (в порядке кандидатов)
+        """
+        regions = dict()
+        for order in self._window(candidates, max_weight):
+            regions.setdefault(order.region, list()).append(order)
+
+        def region_key(region):
+            fitted = self._first_fit(regions[region], max_weight)
+            return -sum(o.weight for o in fitted), region
+
+        candidates = list()
+        for region in sorted(regions, key=region_key):
+            candidates.extend(regions[region])
+        return sorted(
+            self._first_fit(candidates, max_weight), key=self._order_key)
@@ -2,5 +2,8 @@ from .import_couriers_handler import *
 from .update_courier_handler import *
 from .import_orders_handler import *
 from .assign_orders_handler import *
+from .assign_orders_batch_handler import *
 from .complete_order_handler import *
 from .get_courier_info_handler import *
+from .import_job_handlers import *
+from .get_couriers_info_handler import *
@@ -27,11 +27,26 @@ class CourierHandler(RequestHandler, abc.ABC):
         :param data: данные запроса
         """
         try:
-            courier_id = int(self._request.path.split('/')[-1])
-            self._process_courier(CourierWrapper.select(courier_id), data)
+            courier_id = self._get_courier_id()
+            self._process_courier(self._select_courier(courier_id), data)
         except ObjectDoesNotExist:
             self._response = HttpResponseNotFound()
 
+    def _get_courier_id(self):
+        """
+        Получение id курьера из пути запроса
+        :return int: id курьера
+        """
+        return int(self._request.path.split('/')[-1])
+
+    def _select_courier(self, courier_id):
+        """
+        Загрузка данных по курьеру
+        :param int courier_id: id курьера
+        :return CourierWrapper: данные по курьеру
+        """
+        return CourierWrapper.select(courier_id)
+
     @abc.abstractmethod
     def _process_courier(self, courier_wrapper, data):
         """
@@ -0,0 +1,125 @@
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'CourierInfoCache',
+]
+
+
+# =====================================================================================================================
+
+
+class CourierInfoCache:
+    """
+    Кэш ответов на запрос данных о курьере: ключ ответа содержит
+    версию данных курьера, которая также хранится в кэше и меняется
+    при каждом изменении (устаревший ответ больше не читается)
+    """
+
+    @staticmethod
+    def __get_cache():
+        """
+        Получение кэша по настройке CANDY_DELIVERY_COURIER_INFO_CACHE
+        :return: кэш или None, если кэширование отключено
+        """
+        alias = getattr(settings, 'CANDY_DELIVERY_COURIER_INFO_CACHE', None)
+        if alias is None:
+            return None
+        return caches[alias]
+
+    @staticmethod
+    def __version_key(courier_id):
+        """
+        Ключ версии данных курьера
+        :param int courier_id: id курьера
+        :return str: ключ
+        """
+        return 'courier_version:{0}'.format(courier_id)
+
+    @classmethod
+    def enabled(cls):
+        """
+        Признак кэширования ответов
+        :return bool: True, если кэширование включено
+        """
+        return cls.__get_cache() is not None
+
+    @classmethod
+    def get_version(cls, courier_id, create=True):
+        """
+        Получение текущей версии данных курьера
+        (версия создается без ограничения срока хранения, поэтому
+        создавать ее следует только для существующих курьеров)
+        :param int courier_id: id курьера
+        :param bool create: флаг создания версии, если ее еще нет
+        :return str | None: версия (None, если кэширование отключено
+            или версии нет, а флаг create не задан)
+        """
+        cache = cls.__get_cache()
+        if cache is None:
+            return None
+        version_key = cls.__version_key(courier_id)
+        version = cache.get(version_key)
+        if version is None and create:
+            cache.add(version_key, uuid.uuid4().hex, None)
+            version = cache.get(version_key)
+        return version
+
+    @classmethod
+    def get(cls, courier_id, version):
+        """
+        Получение ответа из кэша
+        :param int courier_id: id курьера
+        :param str | None version: версия данных курьера
+        :return dict | None: ответ (None, если ответа нет в кэше)
+        """
+        cache = cls.__get_cache()
+        if cache is None or version is None:
+            return None
+        return cache.get('courier_info:{0}:{1}'.format(courier_id, version))
+
+    @classmethod
+    def set(cls, courier_id, version, content):
+        """
+        Запись ответа в кэш
+        :param int courier_id: id курьера
+        :param str | None version: версия данных курьера,
+            полученная методом get_version до чтения данных из БД
+        :param dict content: ответ
+        """
+        cache = cls.__get_cache()
+        if cache is None or version is None:
+            return
+        cache.set(
+            'courier_info:{0}:{1}'.format(courier_id, version), content,
+            getattr(settings, 'CANDY_DELIVERY_COURIER_INFO_CACHE_TIMEOUT', 300),
+        )
+
+    @classmethod
+    def notify_changed(cls, courier_ids):
+        """
+        Уведомление об изменении данных курьеров (смена версий сразу
+        и, если идет транзакция, повторно после ее фиксации - чтобы
+        ответ, прочитанный до фиксации, не попал в кэш с новой версией)
+        :param courier_ids: id курьеров
+        """
+        cache = cls.__get_cache()
+        courier_ids = list(courier_ids)
+        if cache is None or len(courier_ids) == 0:
+            return
+
+        def bump():
+            cache.set_many({
+                cls.__version_key(courier_id): uuid.uuid4().hex
+                for courier_id in courier_ids
+            }, None)
+
+        bump()
+        if connection.in_atomic_block:
+            transaction.on_commit(bump)
@@ -1,6 +1,13 @@
+import os
 import abc
+import math
+from contextlib import nullcontext
+from django.conf import settings
+from django.db import transaction
 from django.core.exceptions import ValidationError
 from ._request_handler import RequestWithContentHandler
+from ._json_stream import iterate_json_array
+from ._line_stream import iterate_ndjson, iterate_csv
 
 
 # =====================================================================================================================
@@ -34,6 +41,24 @@ class ObjectValidationError(ValidationError):
 # =====================================================================================================================
 
 
+class _UpsertConflictError(Exception):
+    """
+    Ошибка перезаписи объектов, ставших недоступными
+    для изменения после проверки данных (режим upsert)
+    """
+
+    def __init__(self, object_ids):
+        """
+        Инициализация
+        :param list(int) object_ids: id неперезаписанных объектов
+        """
+        super().__init__(object_ids)
+        self.object_ids = object_ids
+
+
+# =====================================================================================================================
+
+
 class ImportHandler(RequestWithContentHandler):
     """
     Обработчик запроса на добавление объектов
@@ -43,19 +68,249 @@ class ImportHandler(RequestWithContentHandler):
     # список id в ответе
     _OUTPUT_KEY = 'objects'
 
+    # Тип 'обертки' для объектов
+    _WRAPPER_TYPE = None
+
+    # Максимальное число объектов
+    # в одном запросе к БД
+    _BATCH_SIZE = 1000
+
+    # Транзакциями управляет сам обработчик
+    # (см. _save_objects_chunked)
+    _ATOMIC = False
+
+    # Размер блока чтения содержимого
+    # запроса при потоковом разборе (байт)
+    _STREAM_CHUNK_SIZE = 65536
+
+    # Функции преобразования значений
+    # по именам столбцов CSV
+    _CSV_PARSERS = dict()
+
+    # Схема элемента запроса
+    _SCHEMA = None
+
+    def __init__(self, content_format='json', *, streaming=None,
+                 progress_callback=None, upsert=False, executor=None, **kwargs):
+        """
+        Инициализация
+        :param str content_format: формат содержимого запроса:
+            'json' ({"data": [...]}), 'ndjson' (по элементу в строке)
+            или 'csv' (по элементу в строке, первая строка - заголовок)
+        :param bool | None streaming: флаг потоковой обработки (None -
+            для NDJSON и CSV всегда, для JSON - по размеру содержимого)
+        :param progress_callback: функция, вызываемая с числом
+            проверенных элементов после каждых _BATCH_SIZE элементов
+            и после фиксации каждой записанной части
+        :param bool upsert: флаг режима upsert: объекты с уже занятыми
+            id не считаются ошибкой - неизмененные (по хэшу данных)
+            пропускаются, измененные перезаписываются, если это
+            допускает _filter_updatable
+        :param concurrent.futures.ProcessPoolExecutor | None executor:
+            долгоживущий пул процессов для проверки данных больших
+            запросов (None - проверка в текущем процессе; пул передает
+            только команда process_imports, обработчики HTTP-запросов
+            дочерних процессов не создают)
+        :param kwargs: параметры родительского класса
+        """
+        super().__init__(**kwargs)
+        self._upsert = upsert
+        self.__executor = executor
+        self.__content_format = content_format
+        self.__streaming = streaming
+        self.__progress_callback = progress_callback
+        self.__n_processed = 0
+
+    @property
+    def n_processed(self):
+        """
+        Получение числа проверенных элементов запроса
+        :return int: число элементов
+        """
+        return self.__n_processed
+
+    def _read_content(self, request):
+        """
+        Разбор содержимого запроса: при потоковой обработке элементы
+        разбираются по мере обработки (для JSON потоковая обработка
+        выполняется при размере содержимого больше
+        CANDY_DELIVERY_STREAMING_IMPORT_THRESHOLD байт или неизвестном
+        размере)
+        :param request: объект запроса
+        :return: данные запроса
+        """
+        if self.__streaming is None:
+            self.__streaming = self.__content_format != 'json' or \
+                self.__is_large(request)
+
+        if self.__content_format == 'ndjson':
+            items = iterate_ndjson(request)
+        elif self.__content_format == 'csv':
+            items = iterate_csv(request, self._CSV_PARSERS)
+        elif self.__streaming:
+            items = iterate_json_array(
+                request, 'data', self._STREAM_CHUNK_SIZE)
+        else:
+            return super()._read_content(request)
+
+        if not self.__streaming:
+            items = list(items)
+        return {'data': items}
+
+    @staticmethod
+    def __is_large(request):
+        """
+        Проверка превышения порога размера содержимого
+        для потоковой обработки JSON
+        :param request: объект запроса
+        :return bool: True, если порог превышен или размер неизвестен
+        """
+        threshold = getattr(
+            settings, 'CANDY_DELIVERY_STREAMING_IMPORT_THRESHOLD', None)
+        if threshold is None:
+            return False
+        content_length = request.META.get('CONTENT_LENGTH')
+        return not content_length or int(content_length) > threshold
+
     def _process(self, data):
         """
         Обработка запроса (специфическая часть)
+        (в режиме upsert объекты, которые к моменту записи стали
+        недоступны для изменения, считаются некорректными - их запись
+        откатывается вместе с текущей транзакцией)
         :param data: данные запроса
         """
-        objects = list()
+        try:
+            if self.__streaming:
+                self.__process_stream(data['data'])
+                return
+
+            invalid_ids = list()
+            objects, accepted_ids = self.__validate(data['data'], set(), invalid_ids)
+            if len(invalid_ids) == 0:
+                self._save_objects_chunked(objects)
+            self.__set_result(invalid_ids, accepted_ids)
+        except _UpsertConflictError as e:
+            self.__set_result(e.object_ids, list())
+
+    def __process_stream(self, items):
+        """
+        Потоковая обработка: проверка и запись элементов запроса
+        частями по _BATCH_SIZE объектов в одной транзакции (в памяти
+        хранится одна часть); при ошибке в данных запись прекращается,
+        транзакция откатывается, а проверка продолжается до конца запроса.
+        Если задана настройка CANDY_DELIVERY_IMPORT_COMMIT_SIZE, каждые
+        CANDY_DELIVERY_IMPORT_COMMIT_SIZE объектов фиксируются отдельной
+        транзакцией (при ошибке в данных или сбое записи уже
+        зафиксированные части сохраняются)
+        :param items: генератор элементов запроса
+        """
+        commit_size = getattr(
+            settings, 'CANDY_DELIVERY_IMPORT_COMMIT_SIZE', None)
         invalid_ids = list()
-        for item in data['data']:
-            try:
-                objects.append(self._init_object(item))
-            except ObjectValidationError as e:
-                invalid_ids.append(e.object_id)
+        imported_ids = list()
+        taken_ids = set()
+        pending = list()
+        with nullcontext() if commit_size else transaction.atomic():
+            for chunk in self.__iterate_chunks(items, self._BATCH_SIZE):
+                objects, accepted_ids = self.__validate(chunk, taken_ids, invalid_ids)
+                if len(invalid_ids) > 0:
+                    continue
+                imported_ids.extend(accepted_ids)
+                if not commit_size:
+                    self._save_objects(objects)
+                    continue
+                pending.extend(objects)
+                n_ready = len(pending) - len(pending) % commit_size
+                self._save_objects_chunked(pending[:n_ready])
+                del pending[:n_ready]
+            if not commit_size and len(invalid_ids) > 0:
+                transaction.set_rollback(True)
+        if len(invalid_ids) == 0:
+            self._save_objects_chunked(pending)
+        self.__set_result(invalid_ids, imported_ids)
+
+    def __validate(self, items, taken_ids, invalid_ids):
+        """
+        Формирование и проверка объектов по элементам запроса
+        :param items: элементы запроса
+        :param set(int) taken_ids: id, занятые предыдущими элементами
+            (дополняется id проверенных элементов)
+        :param list invalid_ids: список id некорректных элементов
+            (дополняется в порядке следования элементов)
+        :return tuple(list(ObjectWrapper), list(int)): объекты для записи
+            и id корректных объектов (в режиме upsert неизмененные
+            объекты не записываются)
+        """
+        # Элементы запроса: пары (id, объект или None, если данные некорректны)
+        checked_items = list()
+        for result in self.__init_objects(items):
+            checked_items.append(result)
+            self.__n_processed += 1
+            if self.__progress_callback is not None and \
+                    self.__n_processed % self._BATCH_SIZE == 0:
+                self.__progress_callback(self.__n_processed)
 
+        # Проверка уникальности id - одним запросом для всех объектов
+        # (повторный id в рамках одного запроса также считается ошибкой)
+        ids = [i for i, o in checked_items if o is not None]
+        existing = dict()
+        if self._upsert:
+            existing = self.__select_existing(ids)
+        else:
+            taken_ids |= self.__select_taken_ids(ids)
+        objects = list()
+        accepted_ids = list()
+        for object_id, object_ in checked_items:
+            if object_ is None or object_id in taken_ids:
+                invalid_ids.append(object_id)
+                continue
+            taken_ids.add(object_id)
+            if object_id in existing:
+                content_hash, updatable = existing[object_id]
+                if content_hash == object_.object_.content_hash:
+                    accepted_ids.append(object_id)
+                    continue
+                if not updatable:
+                    invalid_ids.append(object_id)
+                    continue
+            objects.append(object_)
+            accepted_ids.append(object_id)
+        return objects, accepted_ids
+
+    def __init_objects(self, items):
+        """
+        Формирование объектов по элементам запроса: при наличии пула
+        процессов и числе элементов не меньше
+        CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD - частями в пуле,
+        иначе в текущем процессе
+        :param list items: элементы запроса
+        :return: генератор пар (id, объект или None) в порядке элементов
+        """
+        threshold = getattr(
+            settings, 'CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD', None)
+        if self.__executor is None or threshold is None or len(items) < threshold:
+            yield from self.init_objects(items)
+            return
+
+        # Объекты не пишутся в БД до возврата в текущий процесс,
+        # а проверка уникальности id выполняется здесь же
+        # после формирования всех объектов
+        n_processes = getattr(
+            settings, 'CANDY_DELIVERY_VALIDATION_PROCESSES', None) or os.cpu_count()
+        chunk_size = max(math.ceil(len(items) / (4 * n_processes)), 1)
+        chunks = [
+            items[i:i + chunk_size] for i in range(0, len(items), chunk_size)
+        ]
+        for results in self.__executor.map(type(self).init_objects, chunks):
+            yield from results
+
+    def __set_result(self, invalid_ids, imported_ids):
+        """
+        Формирование ответа
+        :param list invalid_ids: id некорректных элементов
+        :param list(int) imported_ids: id записанных объектов
+        """
         if len(invalid_ids) > 0:
             self._status = 400
             self._content = {
@@ -64,33 +319,162 @@ class ImportHandler(RequestWithContentHandler):
                 },
             }
         else:
-            imported_ids = list()
-            for object_ in objects:
-                imported_ids.append(self._save_object(object_))
             self._status = 201
             self._content = {
                 self._OUTPUT_KEY: self.__create_ids_list(imported_ids),
             }
 
+    @staticmethod
+    def __iterate_chunks(items, chunk_size):
+        """
+        Разбиение последовательности элементов на части
+        :param items: элементы
+        :param int chunk_size: размер части
+        :return: генератор списков элементов
+        """
+        chunk = list()
+        for item in items:
+            chunk.append(item)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = list()
+        if len(chunk) > 0:
+            yield chunk
+
+    @classmethod
+    def init_objects(cls, items, validator=None):
+        """
+        Формирование объектов по элементам запроса (выполняется, в том
+        числе, в дочерних процессах; вместо исключений ObjectValidationError,
+        которые плохо переносятся между процессами, возвращаются пары)
+        :param list items: элементы запроса
+        :param str | None validator: способ проверки данных: 'schema' -
+            по схеме _SCHEMA, 'model' - методами full_clean моделей
+            (None - по настройке CANDY_DELIVERY_IMPORT_VALIDATOR)
+        :return list(tuple): пары (id, объект или None, если данные некорректны)
+        """
+        if validator is None:
+            validator = getattr(
+                settings, 'CANDY_DELIVERY_IMPORT_VALIDATOR', 'schema')
+
+        results = list()
+        if validator == 'schema':
+            for item in items:
+                object_id = item[cls._SCHEMA.id_key]
+                values, errors = cls._SCHEMA.validate(item)
+                if len(errors) > 0:
+                    results.append((object_id, None))
+                else:
+                    results.append((object_id, cls._create_object(values)))
+        else:
+            for item in items:
+                try:
+                    object_ = cls._init_object(item)
+                    results.append((object_.object_.id, object_))
+                except ObjectValidationError as e:
+                    results.append((e.object_id, None))
+
+        for _, object_ in results:
+            if object_ is not None:
+                object_.object_.content_hash = object_.content_hash()
+        return results
+
+    @staticmethod
+    @abc.abstractmethod
+    def _create_object(values):
+        """
+        Формирование объекта по значениям, проверенным по схеме _SCHEMA
+        :param dict values: значения по именам свойств элемента запроса
+        :return ObjectWrapper: объект
+        """
+        pass
+
     @staticmethod
     @abc.abstractmethod
     def _init_object(item):
         """
         Формирование объекта по данным элемента запроса
+        (без проверки уникальности id в БД)
         :param item: элемент запроса
-        :return: объект
+        :return ObjectWrapper: объект
         """
         pass
 
+    def _save_objects_chunked(self, objects):
+        """
+        Запись новых объектов в БД: одна транзакция на весь запрос
+        или, если задана настройка CANDY_DELIVERY_IMPORT_COMMIT_SIZE,
+        по одной транзакции на каждые CANDY_DELIVERY_IMPORT_COMMIT_SIZE
+        объектов (при сбое записи уже зафиксированные части сохраняются)
+        :param list(ObjectWrapper) objects: объекты для записи
+        """
+        commit_size = getattr(
+            settings, 'CANDY_DELIVERY_IMPORT_COMMIT_SIZE', None)
+        if not commit_size:
+            commit_size = max(len(objects), 1)
+        for i in range(0, len(objects), commit_size):
+            with transaction.atomic():
+                self._save_objects(objects[i:i + commit_size])
+            if self.__progress_callback is not None:
+                self.__progress_callback(self.__n_processed)
+
+    def _save_objects(self, objects):
+        """
+        Запись новых объектов в БД (в режиме upsert - INSERT ... ON
+        CONFLICT, иначе bulk_create)
+        :param list(ObjectWrapper) objects: объекты для записи
+        :raises _UpsertConflictError: в режиме upsert - если часть
+            существующих объектов нельзя перезаписать
+        """
+        if self._upsert:
+            rejected_ids = self._WRAPPER_TYPE.bulk_upsert(objects, self._BATCH_SIZE)
+            if len(rejected_ids) > 0:
+                raise _UpsertConflictError(rejected_ids)
+        else:
+            self._WRAPPER_TYPE.bulk_create(objects, self._BATCH_SIZE)
+
+    def __select_taken_ids(self, ids):
+        """
+        Выборка id, уже занятых объектами в БД
+        :param list(int) ids: проверяемые id
+        :return set(int): занятые id
+        """
+        taken_ids = set()
+        model_type = self._WRAPPER_TYPE.MODEL_TYPE
+        for i in range(0, len(ids), self._BATCH_SIZE):
+            taken_ids.update(model_type.objects.filter(
+                id__in=ids[i:i + self._BATCH_SIZE]
+            ).values_list('id', flat=True))
+        return taken_ids
+
+    def __select_existing(self, ids):
+        """
+        Выборка объектов, уже существующих в БД
+        :param list(int) ids: проверяемые id
+        :return dict: пары (хэш данных, флаг допустимости перезаписи) по id
+        """
+        existing = dict()
+        model_type = self._WRAPPER_TYPE.MODEL_TYPE
+        for i in range(0, len(ids), self._BATCH_SIZE):
+            queryset = model_type.objects.filter(
+                id__in=ids[i:i + self._BATCH_SIZE])
+            hashes = dict(queryset.values_list('id', 'content_hash'))
+            if len(hashes) == 0:
+                continue
+            updatable_ids = set(self._filter_updatable(
+                queryset).values_list('id', flat=True))
+            existing.update(
+                (i, (h, i in updatable_ids)) for i, h in hashes.items())
+        return existing
+
     @staticmethod
-    @abc.abstractmethod
-    def _save_object(object_):
+    def _filter_updatable(queryset):
         """
-        Запись объекта в БД
-        :param object_: объект для записи
-        :return int: идентификатор сохраненного объекта
+        Отбор объектов, которые можно перезаписать в режиме upsert
+        :param QuerySet queryset: запрос на выборку объектов
+        :return QuerySet: запрос на выборку объектов, допускающих перезапись
         """
-        pass
+        return queryset
 
     @staticmethod
     def __create_ids_list(ids):
@@ -0,0 +1,215 @@
+import abc
+from decimal import Decimal, InvalidOperation
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'ItemSchema',
+    'IntField',
+    'ChoiceField',
+    'DecimalField',
+    'IntervalField',
+    'ListField',
+]
+
+
+# =====================================================================================================================
+
+
+class SchemaField(abc.ABC):
+    """
+    Поле схемы элемента запроса
+    """
+
+    @abc.abstractmethod
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: (преобразованное значение, None) или (None, текст ошибки)
+        """
+        pass
+
+
+# =====================================================================================================================
+
+
+class IntField(SchemaField):
+    """
+    Целое число (bool не допускается)
+    """
+
+    def __init__(self, min_value=None):
+        """
+        Инициализация
+        :param int | None min_value: минимальное значение
+        """
+        self.__min_value = min_value
+
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: (преобразованное значение, None) или (None, текст ошибки)
+        """
+        if type(value) is not int:
+            return None, 'int expected'
+        if self.__min_value is not None and value < self.__min_value:
+            return None, 'must be at least {0}'.format(self.__min_value)
+        return value, None
+
+
+class ChoiceField(SchemaField):
+    """
+    Значение из заданного набора
+    """
+
+    def __init__(self, choices):
+        """
+        Инициализация
+        :param choices: допустимые значения
+        """
+        self.__choices = frozenset(choices)
+
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: (преобразованное значение, None) или (None, текст ошибки)
+        """
+        if type(value) is not str or value not in self.__choices:
+            return None, 'unsupported value'
+        return value, None
+
+
+class DecimalField(SchemaField):
+    """
+    Число (int или float), преобразуемое в Decimal
+    """
+
+    def __init__(self, min_value, max_value, decimal_places):
+        """
+        Инициализация
+        :param Decimal min_value: минимальное значение
+        :param Decimal max_value: максимальное значение
+        :param int decimal_places: максимальное число знаков после запятой
+        """
+        self.__min_value = min_value
+        self.__max_value = max_value
+        self.__min_exponent = -decimal_places
+
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: (преобразованное значение, None) или (None, текст ошибки)
+        """
+        if type(value) not in (int, float):
+            return None, 'number expected'
+        try:
+            value = Decimal(str(value))
+        except InvalidOperation:
+            return None, 'number expected'
+        if not value.is_finite() or \
+                value.as_tuple().exponent < self.__min_exponent:
+            return None, 'too many decimal places'
+        if value < self.__min_value or value > self.__max_value:
+            return None, 'out of range'
+        return value, None
+
+
+class IntervalField(SchemaField):
+    """
+    Интервал времени в формате '%H:%M-%H:%M'
+    """
+
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: ((начало, конец), None) или (None, текст ошибки)
+        """
+        bounds, error = models.Interval.parse_bounds(value)
+        if error is not None:
+            return None, error
+        if bounds[1] <= bounds[0]:
+            return None, 'start must be less than end'
+        return bounds, None
+
+
+class ListField(SchemaField):
+    """
+    Список значений
+    """
+
+    def __init__(self, item_field, min_length=0):
+        """
+        Инициализация
+        :param SchemaField item_field: поле элемента списка
+        :param int min_length: минимальная длина списка
+        """
+        self.__check_item = item_field.check
+        self.__min_length = min_length
+
+    def check(self, value):
+        """
+        Проверка и преобразование значения (без исключений)
+        :param value: значение
+        :return tuple: (преобразованное значение, None) или (None, текст ошибки)
+        """
+        if type(value) is not list:
+            return None, 'list expected'
+        if len(value) < self.__min_length:
+            return None, 'at least {0} items expected'.format(self.__min_length)
+        items = list()
+        for item in value:
+            item, error = self.__check_item(item)
+            if error is not None:
+                return None, 'item: ' + error
+            items.append(item)
+        return items, None
+
+
+# =====================================================================================================================
+
+
+class ItemSchema:
+    """
+    Декларативная схема элемента запроса на загрузку: все поля
+    обязательны, другие свойства не допускаются; проверка выполняется
+    за один проход без исключений со сбором всех ошибок
+    """
+
+    def __init__(self, id_key, fields):
+        """
+        Инициализация
+        :param str id_key: имя свойства, содержащего id объекта
+        :param dict fields: поля схемы по именам свойств
+        """
+        self.id_key = id_key
+        self.__checks = tuple((key, field.check) for key, field in fields.items())
+        self.__keys = frozenset(fields)
+
+    def validate(self, item):
+        """
+        Проверка элемента запроса
+        :param dict item: элемент запроса
+        :return tuple: (преобразованные значения по именам свойств, список ошибок)
+        """
+        values = dict()
+        errors = list()
+        for key, check in self.__checks:
+            if key not in item:
+                errors.append('"{0}": required'.format(key))
+                continue
+            value, error = check(item[key])
+            if error is None:
+                values[key] = value
+            else:
+                errors.append('"{0}": {1}'.format(key, error))
+        if not self.__keys.issuperset(item):
+            errors.append('Unsupported properties provided')
+        return values, errors
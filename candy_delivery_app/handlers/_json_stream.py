@@ -0,0 +1,147 @@
+import json
+import codecs
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'iterate_json_array',
+]
+
+
+# =====================================================================================================================
+
+
+# Символы-разделители JSON
+_WHITESPACE = ' \t\n\r'
+
+# Символы, которые могут следовать за значением
+_VALUE_END = _WHITESPACE + ',:]}'
+
+# Наибольшая длина неполного окончания числа в конце
+# буфера, которое raw_decode не включает в значение ('e-')
+_MAX_NUMBER_TAIL = 2
+
+
+class _JsonStreamReader:
+    """
+    Последовательное чтение JSON-документа из потока байтов
+    (в памяти хранится только еще не разобранная часть документа)
+    """
+
+    def __init__(self, stream, chunk_size):
+        """
+        Инициализация
+        :param stream: поток (объект с методом read(size))
+        :param int chunk_size: размер блока чтения в байтах
+        """
+        self.__stream = stream
+        self.__chunk_size = chunk_size
+        self.__decoder = codecs.getincrementaldecoder('utf-8')()
+        self.__json_decoder = json.JSONDecoder()
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+
+    def __read(self):
+        """
+        Чтение очередного блока из потока
+        :return bool: False, если поток закончился
+        """
+        if self.__eof:
+            return False
+        chunk = self.__stream.read(self.__chunk_size)
+        self.__eof = len(chunk) == 0
+        self.__buffer = self.__buffer[self.__position:] + \
+            self.__decoder.decode(chunk, final=self.__eof)
+        self.__position = 0
+        return True
+
+    def peek(self):
+        """
+        Получение очередного значимого символа (без его извлечения)
+        :return str: символ или '', если документ закончился
+        """
+        while True:
+            while self.__position < len(self.__buffer) and \
+                    self.__buffer[self.__position] in _WHITESPACE:
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not self.__read():
+                return ''
+
+    def expect(self, char):
+        """
+        Извлечение ожидаемого символа
+        :param str char: ожидаемый символ
+        """
+        if self.peek() != char:
+            raise ValueError(
+                'JSON: "{0}" expected at position {1}'.format(
+                    char, self.__position))
+        self.__position += 1
+
+    def value(self):
+        """
+        Извлечение очередного JSON-значения
+        :return: значение
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self.__json_decoder.raw_decode(
+                    self.__buffer, self.__position)
+                # Число в конце буфера может быть неполным
+                # ('-1' из '-1.5e3', '-1' из '-1.' и т.п.)
+                tail = len(self.__buffer) - end
+                if self.__eof or tail > _MAX_NUMBER_TAIL or \
+                        (tail > 0 and self.__buffer[end] in _VALUE_END):
+                    self.__position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            self.__read()
+
+
+def iterate_json_array(stream, key, chunk_size=65536):
+    """
+    Последовательный разбор элементов массива, заданного
+    ключом key в JSON-объекте верхнего уровня (значения
+    остальных ключей пропускаются)
+    :param stream: поток (объект с методом read(size))
+    :param str key: ключ массива
+    :param int chunk_size: размер блока чтения в байтах
+    :return: генератор элементов массива
+    """
+    reader = _JsonStreamReader(stream, chunk_size)
+    found = False
+    reader.expect('{')
+    if reader.peek() != '}':
+        while True:
+            name = reader.value()
+            if type(name) != str:
+                raise ValueError('JSON: object key expected')
+            reader.expect(':')
+            if name == key and reader.peek() == '[':
+                found = True
+                reader.expect('[')
+                if reader.peek() != ']':
+                    while True:
+                        yield reader.value()
+                        if reader.peek() != ',':
+                            break
+                        reader.expect(',')
+                reader.expect(']')
+            else:
+                reader.value()
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+    reader.expect('}')
+    if reader.peek() != '':
+        raise ValueError('JSON: extra data after the document')
+    if not found:
+        raise KeyError(key)
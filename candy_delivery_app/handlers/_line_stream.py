@@ -0,0 +1,93 @@
+import csv
+import json
+import codecs
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'iterate_ndjson',
+    'iterate_csv',
+    'parse_int',
+    'parse_number',
+    'parse_list',
+]
+
+
+# =====================================================================================================================
+
+
+# Разделитель элементов списка в ячейке CSV
+CSV_LIST_SEPARATOR = ';'
+
+
+def iterate_ndjson(stream):
+    """
+    Последовательный разбор документа NDJSON (по одному
+    JSON-значению в строке, пустые строки пропускаются)
+    :param stream: поток (итератор строк в байтах)
+    :return: генератор значений
+    """
+    for line in stream:
+        if len(line.strip()) > 0:
+            yield json.loads(line)
+
+
+def iterate_csv(stream, parsers):
+    """
+    Последовательный разбор документа CSV с заголовком; значения
+    преобразуются функциями из parsers по имени столбца, при ошибке
+    преобразования остается исходная строка
+    :param stream: поток (итератор строк в байтах)
+    :param dict parsers: функции преобразования значений по именам столбцов
+    :return: генератор словарей {имя столбца: значение}
+    """
+    for row in csv.DictReader(codecs.iterdecode(stream, 'utf-8')):
+        item = dict()
+        for name, value in row.items():
+            parser = parsers.get(name)
+            if parser is not None and value is not None:
+                try:
+                    value = parser(value)
+                except ValueError:
+                    pass
+            item[name] = value
+        yield item
+
+
+def parse_int(value):
+    """
+    Преобразование строки в целое число
+    :param str value: строка
+    :return int: число
+    """
+    return int(value)
+
+
+def parse_number(value):
+    """
+    Преобразование строки в число (целое, если возможно)
+    :param str value: строка
+    :return int | float: число
+    """
+    try:
+        return int(value)
+    except ValueError:
+        return float(value)
+
+
+def parse_list(item_parser=None):
+    """
+    Формирование функции преобразования строки в список
+    значений, разделенных символом CSV_LIST_SEPARATOR
+    :param item_parser: функция преобразования элемента
+    :return: функция преобразования
+    """
+    def parse(value):
+        items = [i.strip() for i in value.split(CSV_LIST_SEPARATOR)]
+        items = [i for i in items if len(i) > 0]
+        if item_parser is None:
+            return items
+        return [item_parser(i) for i in items]
+    return parse
@@ -1,6 +1,8 @@
 import abc
 import sys
 import json
+from django.conf import settings
+from django.db import transaction
 from django.http import JsonResponse
 from django.core.exceptions import ValidationError
 
@@ -23,6 +25,10 @@ class RequestHandler(abc.ABC):
     Базовый класс обработки запроса
     """
 
+    # Флаг выполнения обработки в одной транзакции
+    # (None - по настройке CANDY_DELIVERY_ATOMIC_HANDLERS)
+    _ATOMIC = None
+
     def __init__(self, parse_request_content, *, default_status=500):
         """
         Инициализация
@@ -46,8 +52,12 @@ class RequestHandler(abc.ABC):
         try:
             data = None
             if self._parse_request_content:
-                data = json.loads(request.read())
-            self._process(data)
+                data = self._read_content(request)
+            if self._is_atomic():
+                with transaction.atomic():
+                    self._process(data)
+            else:
+                self._process(data)
         except Exception as error:
             print('{0}: {1}'.format(
                 type(error), str(error)), file=sys.stderr)
@@ -57,6 +67,14 @@ class RequestHandler(abc.ABC):
             }
         return self._create_response()
 
+    def _read_content(self, request):
+        """
+        Разбор содержимого запроса
+        :param request: объект запроса
+        :return: данные запроса
+        """
+        return json.loads(request.read())
+
     @abc.abstractmethod
     def _process(self, data):
         """
@@ -65,6 +83,15 @@ class RequestHandler(abc.ABC):
         """
         pass
 
+    def _is_atomic(self):
+        """
+        Проверка необходимости выполнения обработки в одной транзакции
+        :return bool: True, если обработка выполняется в одной транзакции
+        """
+        if self._ATOMIC is None:
+            return getattr(settings, 'CANDY_DELIVERY_ATOMIC_HANDLERS', False)
+        return self._ATOMIC
+
     @staticmethod
     def _test_type(value, allowed_types):
         """
@@ -0,0 +1,122 @@
+from django.http import HttpResponseBadRequest
+from django.core.exceptions import ValidationError
+from .assign_orders_handler import AssignOrdersHandler
+from ._courier_info_cache import CourierInfoCache
+from ..wrappers import CourierWrapper
+from ..assignment import FreeOrderPool, create_packer, free_order_index
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'AssignOrdersBatchHandler',
+]
+
+
+# =====================================================================================================================
+
+
+class AssignOrdersBatchHandler(AssignOrdersHandler):
+    """
+    Класс обработки запроса на назначение заказов нескольким курьерам
+    (за один проход по общему пулу свободных заказов)
+    """
+
+    def _process(self, data):
+        """
+        Обработка запроса (специфическая часть)
+        :param data: данные запроса
+        """
+        try:
+            courier_ids = AssignOrdersBatchHandler._test_type(
+                data['courier_ids'], {list})
+            for courier_id in courier_ids:
+                AssignOrdersBatchHandler._test_type(courier_id, {int})
+            if len(set(courier_ids)) != len(courier_ids):
+                raise ValidationError('Duplicate courier ids')
+        except (KeyError, ValidationError):
+            self._response = HttpResponseBadRequest()
+            return
+
+        with free_order_index.atomic():
+            # Блокировка курьеров (в порядке id - без взаимоблокировок)
+            couriers = {
+                cw.object_.id: cw for cw in CourierWrapper.select_list(
+                    models.Courier.objects.select_for_update().filter(
+                        id__in=courier_ids).order_by('id')
+                )
+            }
+            if len(couriers) != len(courier_ids):
+                self._response = HttpResponseBadRequest()
+                return
+
+            # Текущие (незавершенные) развозы
+            deliveries = {
+                d.courier_id: d for d in models.Delivery.objects.filter(
+                    courier_id__in=courier_ids, is_complete=False)
+            }
+            new_orders, new_deliveries = self._assign_orders([
+                couriers[i] for i in courier_ids if i not in deliveries
+            ])
+            orders = AssignOrdersBatchHandler.__select_delivery_orders([
+                deliveries[i] for i in courier_ids if i in deliveries
+            ])
+            orders.update(new_orders)
+            deliveries.update(new_deliveries)
+            CourierInfoCache.notify_changed(new_deliveries)
+
+            self._status = 200
+            self._content = {
+                'couriers': [
+                    {
+                        'courier_id': courier_id,
+                        **self._create_content(
+                            deliveries.get(courier_id), orders[courier_id]
+                        ),
+                    }
+                    for courier_id in courier_ids
+                ],
+            }
+
+    def _select_orders(self, courier_wrappers):
+        """
+        Выбор заказов для новых развозов по данным из БД
+        (пул свободных заказов загружается один раз без блокировок,
+        блокируются только выбранные заказы - одним запросом)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return dict(int, list(models.Order)): заказы по id курьеров
+        """
+        if len(courier_wrappers) == 0:
+            return dict()
+
+        packer = create_packer()
+        pool = FreeOrderPool.select(courier_wrappers)
+        orders = dict()
+        for cw in courier_wrappers:
+            orders[cw.object_.id] = packer.pack(
+                pool.candidates(cw), cw.object_.max_weight)
+            pool.take(orders[cw.object_.id])
+
+        locked_ids = {o.id for o in AssignOrdersBatchHandler._lock_selected(
+            [o for selected in orders.values() for o in selected])}
+        return {
+            courier_id: [o for o in selected if o.id in locked_ids]
+            for courier_id, selected in orders.items()
+        }
+
+    @staticmethod
+    def __select_delivery_orders(deliveries):
+        """
+        Загрузка заказов текущих развозов
+        :param list(models.Delivery) deliveries: развозы
+        :return dict(int, list(models.Order)): заказы по id курьеров
+        """
+        orders = {d.courier_id: list() for d in deliveries}
+        if len(deliveries) > 0:
+            courier_ids = {d.id: d.courier_id for d in deliveries}
+            for order in models.Order.objects.filter(
+                    delivery__in=deliveries).order_by('weight', 'id'):
+                orders[courier_ids[order.delivery_id]].append(order)
+        return orders
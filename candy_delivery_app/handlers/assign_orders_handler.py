@@ -1,9 +1,13 @@
 import pyrfc3339
-from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import Q, Case, When, Value, IntegerField
 from django.http import HttpResponseBadRequest
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from ._request_handler import RequestWithContentHandler
-from ..wrappers import CourierWrapper, OrderWrapper
+from ._courier_info_cache import CourierInfoCache
+from ..wrappers import CourierWrapper
+from ..assignment import create_packer, free_order_index, \
+    DeliveryPlanner, OrdersAlreadyAssignedError
 from .. import models
 
 
@@ -23,6 +27,10 @@ class AssignOrdersHandler(RequestWithContentHandler):
     Класс обработки запроса на назначение заказов курьеру
     """
 
+    # Количество заказов-кандидатов,
+    # загружаемых из БД за один запрос
+    _CANDIDATES_CHUNK_SIZE = 100
+
     def _process(self, data):
         """
         Обработка запроса (специфическая часть)
@@ -31,48 +39,208 @@ class AssignOrdersHandler(RequestWithContentHandler):
         try:
             courier_id = AssignOrdersHandler._test_type(
                 data['courier_id'], {int})
-            cw = CourierWrapper.select(courier_id, True)
-        except (KeyError, ValidationError, ObjectDoesNotExist):
+        except (KeyError, ValidationError):
             self._response = HttpResponseBadRequest()
             return
 
+        with free_order_index.atomic():
+            # Блокировка курьера: назначения одному курьеру выполняются
+            # последовательно, разным курьерам - параллельно
+            try:
+                cw = CourierWrapper.select(courier_id, True, for_update=True)
+            except ObjectDoesNotExist:
+                self._response = HttpResponseBadRequest()
+                return
+
+            try:
+                delivery = models.Delivery.objects.get(
+                    courier=cw.object_, is_complete=False
+                )
+                orders = None
+            except ObjectDoesNotExist:
+                orders, deliveries = self._assign_orders([cw])
+                orders = orders[cw.object_.id]
+                delivery = deliveries.get(cw.object_.id)
+                CourierInfoCache.notify_changed(deliveries)
+
+            self._status = 200
+            self._content = self._create_content(
+                delivery, orders
+            )
+
+    def _assign_orders(self, courier_wrappers):
+        """
+        Формирование новых развозов
+        (при включенных резервах сначала подтверждаются резервы;
+        при включенном индексе свободных заказов заказы выбираются
+        по индексу; если резерв или индекс устарел - по данным из БД)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return tuple(dict, dict): заказы (список models.Order)
+            и новые развозы (models.Delivery) по id курьеров
+        """
+        orders, deliveries = dict(), dict()
+        if DeliveryPlanner.enabled():
+            orders, deliveries = AssignOrdersHandler.__confirm_reservations(
+                courier_wrappers)
+            courier_wrappers = [
+                cw for cw in courier_wrappers if cw.object_.id not in orders
+            ]
+
+        if len(courier_wrappers) == 0:
+            return orders, deliveries
+
+        if free_order_index.enabled:
+            new_orders = dict()
+            try:
+                with transaction.atomic():
+                    new_orders = free_order_index.select(
+                        courier_wrappers, create_packer())
+                    new_deliveries = AssignOrdersHandler._attach_orders(
+                        courier_wrappers, new_orders)
+                    return {**orders, **new_orders}, {**deliveries, **new_deliveries}
+            except OrdersAlreadyAssignedError:
+                # Часть заказов назначена другим процессом
+                free_order_index.release(
+                    [o for selected in new_orders.values() for o in selected])
+
+        new_orders = self._select_orders(courier_wrappers)
+        new_deliveries = AssignOrdersHandler._attach_orders(
+            courier_wrappers, new_orders)
+        if free_order_index.enabled:
+            free_order_index.take(
+                [o for selected in new_orders.values() for o in selected])
+        return {**orders, **new_orders}, {**deliveries, **new_deliveries}
+
+    @staticmethod
+    def __confirm_reservations(courier_wrappers):
+        """
+        Формирование новых развозов по резервам
+        (курьеры без резерва или с пустым/устаревшим резервом пропускаются)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return tuple(dict, dict): заказы (список models.Order)
+            и новые развозы (models.Delivery) по id курьеров
+        """
         try:
-            delivery = models.Delivery.objects.get(
-                courier=cw.object_, is_complete=False
+            with transaction.atomic():
+                orders = dict()
+                for cw in courier_wrappers:
+                    reserved = DeliveryPlanner.confirm(cw)
+                    if reserved:
+                        orders[cw.object_.id] = reserved
+                deliveries = AssignOrdersHandler._attach_orders([
+                    cw for cw in courier_wrappers if cw.object_.id in orders
+                ], orders)
+        except OrdersAlreadyAssignedError:
+            return dict(), dict()
+
+        if free_order_index.enabled:
+            free_order_index.take(
+                [o for reserved in orders.values() for o in reserved])
+        return orders, deliveries
+
+    def _select_orders(self, courier_wrappers):
+        """
+        Выбор заказов для новых развозов по данным из БД
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return dict(int, list(models.Order)): заказы по id курьеров
+        """
+        packer = create_packer()
+        orders = dict()
+        for cw in courier_wrappers:
+            orders[cw.object_.id] = AssignOrdersHandler._lock_selected(
+                packer.pack(
+                    AssignOrdersHandler.__iterate_chunked(
+                        cw.select_candidate_orders()),
+                    cw.object_.max_weight
+                )
             )
-        except ObjectDoesNotExist:
+        return orders
+
+    @staticmethod
+    def _lock_selected(orders):
+        """
+        Блокировка выбранных заказов (кандидаты читаются без блокировок,
+        чтобы не блокировать заказы, не попавшие в развоз); заказы,
+        заблокированные параллельными назначениями, пропускаются
+        :param list(models.Order) orders: выбранные заказы
+        :return list(models.Order): заблокированные заказы
+        """
+        if len(orders) == 0 or \
+                not connection.features.has_select_for_update_skip_locked:
+            return orders
+        locked_ids = set(models.Order.objects.select_for_update(
+            skip_locked=True).filter(
+            id__in=[o.id for o in orders], delivery=None
+        ).values_list('id', flat=True))
+        return [o for o in orders if o.id in locked_ids]
+
+    @staticmethod
+    def _attach_orders(courier_wrappers, orders):
+        """
+        Создание новых развозов и привязка к ним заказов (одним запросом)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :param dict(int, list(models.Order)) orders: заказы по id курьеров
+        :return dict(int, models.Delivery): новые развозы по id курьеров
+        """
+        deliveries = dict()
+        order_ids = list()
+        cases = list()
+        for cw in courier_wrappers:
+            ids = [o.id for o in orders[cw.object_.id]]
+            if len(ids) == 0:
+                continue
             delivery = models.Delivery.objects.create(
                 courier=cw.object_,
                 earnings_factor=cw.object_.earnings_factor
             )
+            deliveries[cw.object_.id] = delivery
+            order_ids.extend(ids)
+            cases.append(When(id__in=ids, then=Value(delivery.id)))
 
-            total_weight = Decimal('0.00')
-            free_orders = models.Order.objects.filter(
-                delivery=None).order_by('weight')
-            for order in free_orders:
-                if not cw.test_order(OrderWrapper(order, True)):
-                    continue
-
-                total_weight += order.weight
-                if total_weight > cw.object_.max_weight:
-                    break
-
-                delivery.order_set.add(order)
+        if len(order_ids) > 0:
+            if len(deliveries) == 1:
+                delivery_value = next(iter(deliveries.values()))
+            else:
+                delivery_value = Case(*cases, output_field=IntegerField())
+            n_updated = models.Order.objects.filter(
+                id__in=order_ids, delivery=None
+            ).update(delivery=delivery_value)
+            if n_updated != len(order_ids):
+                raise OrdersAlreadyAssignedError(
+                    'Some of the selected orders are already assigned')
+        return deliveries
 
-        self._status = 200
-        self._content = self.__create_content(
-            delivery
-        )
+    @staticmethod
+    def __iterate_chunked(candidates):
+        """
+        Постраничный обход заказов-кандидатов (по весу и id);
+        очередная порция загружается только по мере необходимости
+        :param QuerySet candidates: заказы, упорядоченные по весу и id
+        :return: генератор заказов
+        """
+        chunk_size = AssignOrdersHandler._CANDIDATES_CHUNK_SIZE
+        chunk = list(candidates[:chunk_size])
+        while len(chunk) > 0:
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+            last = chunk[-1]
+            chunk = list(candidates.filter(
+                Q(weight__gt=last.weight) | Q(weight=last.weight, id__gt=last.id)
+            )[:chunk_size])
 
     @staticmethod
-    def __create_content(delivery):
+    def _create_content(delivery, orders=None):
         """
         Формирование выходной структуры данных
-        :param models.Delivery delivery: развоз
+        :param models.Delivery | None delivery: развоз
+        :param list(models.Order) | None orders: заказы развоза
+            (если не заданы, загружаются из БД)
         :return dict: выходная структура данных
         """
-        orders = delivery.order_set.all()
-        if len(orders) > 0:
+        if delivery is not None and orders is None:
+            orders = list(delivery.order_set.order_by('weight', 'id'))
+        if delivery is not None and len(orders) > 0:
             return {
                 'orders': [
                     {'id': o.id} for o in orders if o.complete_time is None
@@ -82,7 +250,8 @@ class AssignOrdersHandler(RequestWithContentHandler):
                 ),
             }
         else:
-            delivery.delete()
+            if delivery is not None:
+                delivery.delete()
             return {
                 'orders': list()
             }
@@ -2,6 +2,7 @@ from pyrfc3339 import parse
 from django.http import HttpResponseBadRequest
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from ._request_handler import RequestWithContentHandler
+from ._courier_info_cache import CourierInfoCache
 from .. import models
 
 
@@ -58,11 +59,15 @@ class CompleteOrderHandler(RequestWithContentHandler):
             order.delivery_duration = (
                     order.complete_time - start_time).total_seconds()
             order.save()
-            order.delivery.update_complete()
 
+            # Продолжительность пересчитывается до завершения
+            # развоза, т.к. при завершении обновляется статистика
             if order.delivery_duration < 0.:
                 self.__recalculate_duration(order.delivery)
 
+            order.delivery.update_complete()
+            CourierInfoCache.notify_changed([courier_id])
+
         self._status = 200
         self._content = {
             'order_id': order.id,
@@ -1,6 +1,13 @@
-from django.db.models import Sum, Avg, Min
+import json
+import hashlib
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from django.core.exceptions import ObjectDoesNotExist
 from ._courier_handler import CourierHandler
 from ._request_handler import RequestWithoutContentHandler
+from ._courier_info_cache import CourierInfoCache
+from ..wrappers import CourierWrapper
+from .. import models
 
 
 # =====================================================================================================================
@@ -19,25 +26,136 @@ class GetCourierInfoHandler(RequestWithoutContentHandler, CourierHandler):
     Обработчик запроса на получение данных о курьере
     """
 
+    def __init__(self, **kwargs):
+        """
+        Инициализация
+        :param kwargs: параметры родительского класса
+        """
+        super().__init__(**kwargs)
+        self.__etag = None
+
+    def _process(self, data):
+        """
+        Обработка запроса (ответ берется из кэша, если данные
+        курьера не менялись с момента записи ответа в кэш; если
+        версия данных совпадает с If-None-Match - ответ 304)
+        :param data: данные запроса
+        """
+        courier_id = self._get_courier_id()
+        version = CourierInfoCache.get_version(courier_id, create=False)
+
+        # Версия создается только для существующего курьера
+        # (запросы по несуществующим id не занимают место в кэше)
+        if version is None and CourierInfoCache.enabled() and \
+                models.Courier.objects.filter(id=courier_id).exists():
+            version = CourierInfoCache.get_version(courier_id)
+        if version is not None:
+            self.__etag = quote_etag(version)
+        elif not CourierInfoCache.enabled() and \
+                'HTTP_IF_NONE_MATCH' in self._request.META:
+            # Без кэша - ETag по хэшу данных и статистике курьера
+            # (без загрузки районов, часов и расчета заработка и рейтинга)
+            marker = models.Courier.objects.filter(id=courier_id).values_list(
+                'content_hash', 'stats__earnings_factor_sum', 'stats__region_durations',
+            ).first()
+            if marker is not None:
+                self.__etag = self.__create_etag(*marker)
+        if self.__etag is not None and self.__is_not_modified():
+            self._response = HttpResponseNotModified()
+            return
+
+        content = CourierInfoCache.get(courier_id, version)
+        if content is not None:
+            self._status = 200
+            self._content = content
+            return
+        super()._process(data)
+        if self._status != 200:
+            return
+        CourierInfoCache.set(courier_id, version, self._content)
+
+    @staticmethod
+    def __create_etag(content_hash, earnings_factor_sum, region_durations):
+        """
+        Формирование ETag по данным курьера без кэша
+        :param str content_hash: хэш данных курьера
+        :param int | None earnings_factor_sum: сумма коэффициентов заработка
+        :param dict | None region_durations: время доставки по районам
+        :return str | None: ETag (None, если хэш данных не вычислен -
+            курьер записан в обход обработчиков запросов)
+        """
+        if not content_hash:
+            return None
+        return quote_etag(hashlib.md5(json.dumps(
+            [content_hash, earnings_factor_sum, region_durations],
+            sort_keys=True).encode()).hexdigest())
+
+    def __is_not_modified(self):
+        """
+        Проверка совпадения ETag с заголовком If-None-Match
+        :return bool: True, если данные у клиента актуальны
+        """
+        return self.__etag in parse_etags(
+            self._request.META.get('HTTP_IF_NONE_MATCH', ''))
+
+    def _create_response(self):
+        """
+        Формирование ответа (с заголовком ETag)
+        :return: результат обработки
+        """
+        response = super()._create_response()
+        if self.__etag is not None and response.status_code in (200, 304):
+            response['ETag'] = self.__etag
+        return response
+
+    def _select_courier(self, courier_id):
+        """
+        Загрузка данных по курьеру (статистика загружается
+        тем же запросом, что и курьер)
+        :param int courier_id: id курьера
+        :return CourierWrapper: данные по курьеру
+        """
+        return CourierWrapper.select(
+            courier_id,
+            queryset=models.Courier.objects.select_related('stats'),
+        )
+
     def _process_courier(self, courier_wrapper, data):
         """
         Обработка запроса (специфическая часть)
         :param CourierWrapper courier_wrapper: данные по курьеру
         :param data: данные запроса
         """
-        # Основные данные
         self._status = 200
-        self._content = courier_wrapper.to_json_data()
-
-        # Заработок и рейтинг
-        q = courier_wrapper.object_.delivery_set.filter(
-            is_complete=True)
-        if len(q) == 0:
-            self._content['earnings'] = 0
-        else:
-            self._content['earnings'] = q.aggregate(
-                Sum('earnings_factor'))['earnings_factor__sum'] * 500
-            t = q.values('order__region').\
-                annotate(avg_duration=Avg('order__delivery_duration')).\
-                aggregate(Min('avg_duration'))['avg_duration__min']
-            self._content['rating'] = 5. * (3600. - min(t, 3600.)) / 3600.
+        self._content = self.create_content(courier_wrapper)
+        if self.__etag is None and not CourierInfoCache.enabled():
+            try:
+                stats = courier_wrapper.object_.stats
+                marker = (stats.earnings_factor_sum, stats.region_durations)
+            except ObjectDoesNotExist:
+                marker = (None, None)
+            self.__etag = self.__create_etag(
+                courier_wrapper.object_.content_hash, *marker)
+
+    @staticmethod
+    def create_content(courier_wrapper):
+        """
+        Формирование данных о курьере для выдачи
+        (статистика курьера должна быть загружена вместе с ним)
+        :param CourierWrapper courier_wrapper: данные по курьеру
+        :return dict: данные для выдачи
+        """
+        # Основные данные
+        content = courier_wrapper.to_json_data()
+
+        # Заработок и рейтинг (по статистике завершенных развозов)
+        try:
+            stats = courier_wrapper.object_.stats
+        except ObjectDoesNotExist:
+            content['earnings'] = 0
+            return content
+        content['earnings'] = stats.get_earnings()
+        rating = stats.get_rating()
+        if rating is not None:
+            content['rating'] = rating
+        return content
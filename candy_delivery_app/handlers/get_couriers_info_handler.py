@@ -0,0 +1,84 @@
+from django.http import HttpResponseBadRequest
+from django.core.exceptions import ValidationError
+from ._request_handler import RequestWithContentHandler
+from .get_courier_info_handler import GetCourierInfoHandler
+from ..wrappers import CourierWrapper
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'GetCouriersInfoHandler',
+]
+
+
+# =====================================================================================================================
+
+
+class GetCouriersInfoHandler(RequestWithContentHandler):
+    """
+    Обработчик запроса на получение данных о нескольких курьерах
+    (POST с {"courier_ids": [...]} или GET с параметром ids=1,2,3)
+    """
+
+    # Максимальное число курьеров,
+    # загружаемых из БД за один запрос
+    _BATCH_SIZE = 500
+
+    def _read_content(self, request):
+        """
+        Разбор содержимого запроса (для GET - параметра ids)
+        :param request: объект запроса
+        :return: данные запроса
+        """
+        if request.method != 'GET':
+            return super()._read_content(request)
+        courier_ids = list()
+        for courier_id in request.GET.get('ids', '').split(','):
+            try:
+                courier_ids.append(int(courier_id))
+            except ValueError:
+                courier_ids.append(courier_id)
+        return {
+            'courier_ids': courier_ids,
+        }
+
+    def _process(self, data):
+        """
+        Обработка запроса (специфическая часть)
+        :param data: данные запроса
+        """
+        try:
+            courier_ids = GetCouriersInfoHandler._test_type(
+                data['courier_ids'], {list})
+            for courier_id in courier_ids:
+                GetCouriersInfoHandler._test_type(courier_id, {int})
+            if len(set(courier_ids)) != len(courier_ids):
+                raise ValidationError('Duplicate courier ids')
+        except (KeyError, TypeError, ValidationError):
+            self._response = HttpResponseBadRequest()
+            return
+
+        # Курьеры со статистикой, регионами и рабочими
+        # часами - три запроса на каждые _BATCH_SIZE курьеров
+        couriers = dict()
+        for i in range(0, len(courier_ids), self._BATCH_SIZE):
+            couriers.update(
+                (cw.object_.id, cw) for cw in CourierWrapper.select_list(
+                    models.Courier.objects.select_related('stats').filter(
+                        id__in=courier_ids[i:i + self._BATCH_SIZE])
+                )
+            )
+        if len(couriers) != len(courier_ids):
+            self._response = HttpResponseBadRequest()
+            return
+
+        self._status = 200
+        self._content = {
+            'couriers': [
+                GetCourierInfoHandler.create_content(couriers[courier_id])
+                for courier_id in courier_ids
+            ],
+        }
@@ -1,5 +1,8 @@
 from django.core.exceptions import ValidationError
 from ._import_handler import ImportHandler, ObjectValidationError
+from ._courier_info_cache import CourierInfoCache
+from ._line_stream import parse_int, parse_list
+from ._item_schema import ItemSchema, IntField, ChoiceField, ListField, IntervalField
 from ..wrappers import CourierWrapper
 from .. import models
 
@@ -24,6 +27,67 @@ class ImportCouriersHandler(ImportHandler):
     # список id в ответе
     _OUTPUT_KEY = 'couriers'
 
+    # Тип 'обертки' для объектов
+    _WRAPPER_TYPE = CourierWrapper
+
+    # Функции преобразования значений
+    # по именам столбцов CSV
+    _CSV_PARSERS = {
+        'courier_id': parse_int,
+        'regions': parse_list(parse_int),
+        'working_hours': parse_list(),
+    }
+
+    # Схема элемента запроса
+    _SCHEMA = ItemSchema('courier_id', {
+        'courier_id': IntField(min_value=1),
+        'courier_type': ChoiceField(models.Courier.AllowedTypes.values),
+        'regions': ListField(IntField(min_value=1)),
+        'working_hours': ListField(IntervalField()),
+    })
+
+    def _save_objects(self, objects):
+        """
+        Запись новых объектов в БД (резервы перезаписанных
+        курьеров удаляются - их сформирует планировщик)
+        :param list(ObjectWrapper) objects: объекты для записи
+        """
+        super()._save_objects(objects)
+        if self._upsert:
+            courier_ids = [o.object_.id for o in objects]
+            models.Reservation.objects.filter(
+                courier_id__in=courier_ids).delete()
+            CourierInfoCache.notify_changed(courier_ids)
+
+    @staticmethod
+    def _filter_updatable(queryset):
+        """
+        Отбор объектов, которые можно перезаписать в режиме upsert
+        (курьеры без незавершенных развозов)
+        :param QuerySet queryset: запрос на выборку объектов
+        :return QuerySet: запрос на выборку объектов, допускающих перезапись
+        """
+        return queryset.exclude(delivery__is_complete=False)
+
+    @staticmethod
+    def _create_object(values):
+        """
+        Формирование объекта по значениям, проверенным по схеме _SCHEMA
+        :param dict values: значения по именам свойств элемента запроса
+        :return CourierWrapper: объект
+        """
+        cw = CourierWrapper(models.Courier(
+            id=values['courier_id'], type=values['courier_type']))
+        cw.regions = [
+            models.Region(number=number, courier=cw.object_)
+            for number in values['regions']
+        ]
+        cw.working_hours = [
+            models.Interval(min_time=min_time, max_time=max_time, courier=cw.object_)
+            for min_time, max_time in values['working_hours']
+        ]
+        return cw
+
     @staticmethod
     def _init_object(item):
         """
@@ -40,7 +104,7 @@ class ImportCouriersHandler(ImportHandler):
                 item.pop('regions'), cw.object_)
             cw.working_hours = models.Interval.from_string_list(
                 item.pop('working_hours'), courier_fk=cw.object_)
-            cw.clean()
+            cw.clean(validate_unique=False)
         except (KeyError, ValidationError) as e:
             raise ObjectValidationError(
                 courier_id, str(e)) from e
@@ -51,13 +115,3 @@ class ImportCouriersHandler(ImportHandler):
             )
 
         return cw
-
-    @staticmethod
-    def _save_object(object_):
-        """
-        Запись объекта в БД
-        :param object_: объект для записи
-        :return int: идентификатор сохраненного объекта
-        """
-        object_.save()
-        return object_.object_.id
@@ -0,0 +1,84 @@
+from django.http import HttpResponseNotFound
+from django.core.exceptions import ObjectDoesNotExist
+from ._request_handler import RequestWithoutContentHandler
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'EnqueueImportHandler',
+    'GetImportJobHandler',
+]
+
+
+# =====================================================================================================================
+
+
+class EnqueueImportHandler(RequestWithoutContentHandler):
+    """
+    Обработчик запроса на асинхронную загрузку: содержимое запроса
+    сохраняется в задание, которое выполняет команда process_imports
+    """
+
+    def __init__(self, kind, content_format='json', *, upsert=False, **kwargs):
+        """
+        Инициализация
+        :param str kind: тип загружаемых объектов (models.ImportJob.AllowedKinds)
+        :param str content_format: формат содержимого запроса
+        :param bool upsert: флаг загрузки в режиме upsert
+        :param kwargs: параметры родительского класса
+        """
+        super().__init__(**kwargs)
+        self.__kind = kind
+        self.__content_format = content_format
+        self.__upsert = upsert
+
+    def _process(self, data):
+        """
+        Обработка запроса (специфическая часть)
+        :param data: данные запроса
+        """
+        job = models.ImportJob.objects.create(
+            kind=self.__kind,
+            content_format=self.__content_format,
+            upsert=self.__upsert,
+            payload=self._request.read(),
+        )
+        self._status = 202
+        self._content = {
+            'import_id': job.id,
+        }
+
+
+# =====================================================================================================================
+
+
+class GetImportJobHandler(RequestWithoutContentHandler):
+    """
+    Обработчик запроса на получение состояния задания на загрузку
+    """
+
+    def _process(self, data):
+        """
+        Обработка запроса (специфическая часть)
+        :param data: данные запроса
+        """
+        try:
+            job_id = int(self._request.path.split('/')[-1])
+            job = models.ImportJob.objects.defer('payload').get(id=job_id)
+        except ObjectDoesNotExist:
+            self._response = HttpResponseNotFound()
+            return
+
+        self._status = 200
+        self._content = {
+            'import_id': job.id,
+            'kind': job.kind,
+            'status': job.status,
+            'processed_items': job.n_processed,
+        }
+        if job.result_status is not None:
+            self._content['result_status'] = job.result_status
+            self._content['result'] = job.result
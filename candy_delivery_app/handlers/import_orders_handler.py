@@ -1,6 +1,10 @@
+from decimal import Decimal
 from django.core.exceptions import ValidationError
 from ._import_handler import ImportHandler, ObjectValidationError
+from ._line_stream import parse_int, parse_number, parse_list
+from ._item_schema import ItemSchema, IntField, DecimalField, ListField, IntervalField
 from ..wrappers import OrderWrapper
+from ..assignment import FreeOrderIndex
 from .. import models
 
 
@@ -24,6 +28,65 @@ class ImportOrdersHandler(ImportHandler):
     # список id в ответе
     _OUTPUT_KEY = 'orders'
 
+    # Тип 'обертки' для объектов
+    _WRAPPER_TYPE = OrderWrapper
+
+    # Функции преобразования значений
+    # по именам столбцов CSV
+    _CSV_PARSERS = {
+        'order_id': parse_int,
+        'weight': parse_number,
+        'region': parse_int,
+        'delivery_hours': parse_list(),
+    }
+
+    # Схема элемента запроса
+    _SCHEMA = ItemSchema('order_id', {
+        'order_id': IntField(min_value=1),
+        'weight': DecimalField(Decimal('0.01'), Decimal('50.00'), 2),
+        'region': IntField(min_value=1),
+        'delivery_hours': ListField(IntervalField(), min_length=1),
+    })
+
+    def _save_objects(self, objects):
+        """
+        Запись новых объектов в БД с уведомлением индекса свободных
+        заказов (резервы, содержащие перезаписанные заказы, удаляются -
+        их сформирует планировщик)
+        :param list(ObjectWrapper) objects: объекты для записи
+        """
+        super()._save_objects(objects)
+        if len(objects) > 0:
+            FreeOrderIndex.notify_changed()
+        if self._upsert:
+            models.Reservation.objects.filter(
+                order__id__in=[o.object_.id for o in objects]).delete()
+
+    @staticmethod
+    def _filter_updatable(queryset):
+        """
+        Отбор объектов, которые можно перезаписать в режиме upsert
+        (заказы, не назначенные курьерам)
+        :param QuerySet queryset: запрос на выборку объектов
+        :return QuerySet: запрос на выборку объектов, допускающих перезапись
+        """
+        return queryset.filter(delivery=None)
+
+    @staticmethod
+    def _create_object(values):
+        """
+        Формирование объекта по значениям, проверенным по схеме _SCHEMA
+        :param dict values: значения по именам свойств элемента запроса
+        :return OrderWrapper: объект
+        """
+        ow = OrderWrapper(models.Order(
+            id=values['order_id'], weight=values['weight'], region=values['region']))
+        ow.delivery_hours = [
+            models.Interval(min_time=min_time, max_time=max_time, order=ow.object_)
+            for min_time, max_time in values['delivery_hours']
+        ]
+        return ow
+
     @staticmethod
     def _init_object(item):
         """
@@ -41,7 +104,7 @@ class ImportOrdersHandler(ImportHandler):
                 item.pop('region'), {int})
             ow.delivery_hours = models.Interval.from_string_list(
                 item.pop('delivery_hours'), order_fk=ow.object_)
-            ow.clean()
+            ow.clean(validate_unique=False)
         except (KeyError, ValidationError) as e:
             raise ObjectValidationError(
                 order_id, str(e)) from e
@@ -57,13 +120,3 @@ class ImportOrdersHandler(ImportHandler):
             )
 
         return ow
-
-    @staticmethod
-    def _save_object(object_):
-        """
-        Запись объекта в БД
-        :param object_: объект для записи
-        :return int: идентификатор сохраненного объекта
-        """
-        object_.save()
-        return object_.object_.id
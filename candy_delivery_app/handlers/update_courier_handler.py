@@ -4,7 +4,9 @@ from django.http import HttpResponseBadRequest
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from ._request_handler import RequestWithContentHandler
 from ._courier_handler import CourierHandler
+from ._courier_info_cache import CourierInfoCache
 from ..wrappers import CourierWrapper, OrderWrapper
+from ..assignment import FreeOrderIndex
 from .. import models
 
 
@@ -52,9 +54,12 @@ class UpdateCourierHandler(RequestWithContentHandler, CourierHandler):
 
         courier_wrapper.save(True)
         courier_wrapper.refresh()
+        models.Reservation.objects.filter(
+            courier=courier_wrapper.object_).delete()
         self._status = 200
         self._content = courier_wrapper.to_json_data()
         self.__update_current_delivery(courier_wrapper)
+        CourierInfoCache.notify_changed([courier_wrapper.object_.id])
 
     @staticmethod
     def __update_current_delivery(courier_wrapper):
@@ -70,23 +75,23 @@ class UpdateCourierHandler(RequestWithContentHandler, CourierHandler):
             return
 
         # Список незавершенных заказов
-        incomplete_orders = list(
+        incomplete_orders = OrderWrapper.select_list(
             current_delivery.order_set.filter(
                 complete_time=None).order_by('weight')
         )
+        n_incomplete_orders = len(incomplete_orders)
 
         # Сначала выбросим все, что не подходит
         # по району и времени доставки
         temp_orders = list()
         total_weight = Decimal('0.00')
-        for order in incomplete_orders:
-            if courier_wrapper.test_order(
-                    OrderWrapper(order, True)):
-                total_weight += order.weight
-                temp_orders.append(order)
+        for ow in incomplete_orders:
+            if courier_wrapper.test_order(ow):
+                total_weight += ow.object_.weight
+                temp_orders.append(ow.object_)
             else:
-                order.delivery = None
-                order.save()
+                ow.object_.delivery = None
+                ow.object_.save()
         incomplete_orders = temp_orders
 
         # Теперь выбросим заказы, не подходящие по весу
@@ -97,13 +102,16 @@ class UpdateCourierHandler(RequestWithContentHandler, CourierHandler):
             order.save()
             total_weight -= order.weight
 
+        # Заказы, снятые с развоза, снова свободны
+        if len(incomplete_orders) < n_incomplete_orders:
+            FreeOrderIndex.notify_changed()
+
         # Если незавершенных заказов не осталось,
         # то справедливо одно из двух:
         # 1) заказов не осталось вообще - удалить доставку
         # 2) остались только завершенные заказы - завершить доставку
         if len(incomplete_orders) == 0:
             if len(current_delivery.order_set.all()) > 0:
-                current_delivery.is_complete = True
-                current_delivery.save()
+                current_delivery.complete()
             else:
                 current_delivery.delete()
@@ -0,0 +1 @@
+from .import_job_runner import *
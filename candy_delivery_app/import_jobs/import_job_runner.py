@@ -0,0 +1,190 @@
+import io
+import os
+import sys
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ..handlers import ImportCouriersHandler, ImportOrdersHandler
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'ImportJobRunner',
+]
+
+
+# =====================================================================================================================
+
+
+class _StoredRequest(io.BytesIO):
+    """
+    Запрос на загрузку, восстановленный из задания
+    (поддерживает интерфейс запроса, используемый ImportHandler)
+    """
+
+    def __init__(self, payload):
+        """
+        Инициализация
+        :param bytes payload: содержимое запроса
+        """
+        super().__init__(payload)
+        self.META = {
+            'CONTENT_LENGTH': str(len(payload)),
+        }
+
+
+# =====================================================================================================================
+
+
+class ImportJobRunner:
+    """
+    Обработчик очереди заданий на асинхронную загрузку
+    """
+
+    # Обработчики загрузки по типам объектов
+    HANDLER_TYPES = {
+        models.ImportJob.AllowedKinds.COURIERS: ImportCouriersHandler,
+        models.ImportJob.AllowedKinds.ORDERS: ImportOrdersHandler,
+    }
+
+    def __init__(self):
+        """
+        Инициализация
+        """
+        self.__executor = None
+
+    def close(self):
+        """
+        Завершение пула процессов проверки данных
+        """
+        if self.__executor is not None:
+            self.__executor.shutdown()
+            self.__executor = None
+
+    def __get_executor(self):
+        """
+        Получение пула процессов для проверки данных больших заданий:
+        один пул из CANDY_DELIVERY_VALIDATION_PROCESSES процессов (None -
+        по числу ядер) создается через fork при первом обращении
+        и используется всеми заданиями
+        :return ProcessPoolExecutor | None: пул или None, если
+            параллельная проверка отключена
+        """
+        if getattr(settings, 'CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD', None) is None:
+            return None
+        n_processes = getattr(
+            settings, 'CANDY_DELIVERY_VALIDATION_PROCESSES', None) or os.cpu_count()
+        if n_processes < 2:
+            return None
+        if self.__executor is None:
+            self.__executor = ProcessPoolExecutor(
+                n_processes, mp_context=multiprocessing.get_context('fork'))
+        return self.__executor
+
+    def fail_stale(self):
+        """
+        Завершение с ошибкой заданий, от обработчиков которых нет
+        подтверждения хода обработки дольше CANDY_DELIVERY_IMPORT_JOB_TIMEOUT
+        секунд (обработчик прервался; задания без времени подтверждения
+        захвачены до появления этого поля)
+        :return int: число таких заданий
+        """
+        timeout = getattr(settings, 'CANDY_DELIVERY_IMPORT_JOB_TIMEOUT', None)
+        if timeout is None:
+            return 0
+        now = timezone.now()
+        return models.ImportJob.objects.filter(
+            Q(heartbeat_time__lt=now - timedelta(seconds=timeout)) |
+            Q(heartbeat_time=None),
+            status=models.ImportJob.AllowedStatuses.RUNNING,
+        ).update(
+            status=models.ImportJob.AllowedStatuses.FAILED,
+            result_status=500,
+            result={'error': 'Import job timed out'},
+            payload=b'',
+            finish_time=now,
+        )
+
+    def run_all(self):
+        """
+        Обработка всех заданий в очереди
+        :return int: число обработанных заданий
+        """
+        n_jobs = 0
+        while self.run_next():
+            n_jobs += 1
+        return n_jobs
+
+    def run_next(self):
+        """
+        Обработка очередного задания
+        :return bool: False, если очередь пуста
+        """
+        job = self.__claim_next()
+        if job is None:
+            return False
+        self.run(job)
+        return True
+
+    def run(self, job):
+        """
+        Обработка задания (проверка выполняется вне транзакции,
+        поэтому ход проверки виден при запросе состояния задания);
+        результат записывается, только если задание еще в состоянии
+        RUNNING (его не завершил с ошибкой fail_stale другого процесса)
+        :param models.ImportJob job: задание в состоянии RUNNING
+        :return bool: False, если задание завершено другим процессом
+        """
+        running_job = models.ImportJob.objects.filter(
+            id=job.id, status=models.ImportJob.AllowedStatuses.RUNNING)
+        handler = self.HANDLER_TYPES[job.kind](
+            job.content_format, streaming=False, upsert=job.upsert,
+            executor=self.__get_executor(),
+            progress_callback=lambda n: running_job.update(
+                n_processed=n, heartbeat_time=timezone.now()),
+        )
+        response = handler.process(_StoredRequest(bytes(job.payload)))
+        if response.status_code == 500:
+            status = models.ImportJob.AllowedStatuses.FAILED
+        else:
+            status = models.ImportJob.AllowedStatuses.DONE
+        if running_job.update(
+                status=status,
+                n_processed=handler.n_processed,
+                result_status=response.status_code,
+                result=json.loads(response.content),
+                payload=b'',
+                finish_time=timezone.now(),
+        ) == 0:
+            print('Import job {0} was failed as stale before it finished '
+                  '(result status {1})'.format(job.id, response.status_code),
+                  file=sys.stderr)
+            return False
+        return True
+
+    @staticmethod
+    def __claim_next():
+        """
+        Захват очередного задания (перевод в состояние RUNNING условным
+        UPDATE, так что одно задание достается только одному процессу)
+        :return models.ImportJob | None: задание или None, если очередь пуста
+        """
+        queued_jobs = models.ImportJob.objects.filter(
+            status=models.ImportJob.AllowedStatuses.QUEUED)
+        while True:
+            job_id = queued_jobs.order_by('id').values_list(
+                'id', flat=True).first()
+            if job_id is None:
+                return None
+            now = timezone.now()
+            if queued_jobs.filter(id=job_id).update(
+                    status=models.ImportJob.AllowedStatuses.RUNNING,
+                    started_time=now, heartbeat_time=now) == 1:
+                return models.ImportJob.objects.get(id=job_id)
@@ -0,0 +1,169 @@
+import json
+import math
+import time
+import random
+from decimal import Decimal
+from datetime import time as day_time
+from django.db import connection, transaction
+from django.db.models import Max, Sum
+from django.test import RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management.base import BaseCommand, CommandError
+from ...assignment import PACKERS
+from ...handlers import AssignOrdersHandler
+from ... import models
+
+
+# =====================================================================================================================
+
+
+class Command(BaseCommand):
+    """
+    Сравнение стратегий назначения заказов на синтетических данных
+    (данные создаются в транзакции, которая затем откатывается)
+    """
+
+    help = 'Compares order assignment strategies on synthetic couriers and orders'
+
+    def add_arguments(self, parser):
+        """
+        Описание аргументов команды
+        :param parser: парсер аргументов
+        """
+        parser.add_argument(
+            'strategies', nargs='*',
+            help='Strategies to compare (by default all registered ones)',
+        )
+        parser.add_argument('--couriers', type=int, default=100, help='Number of couriers')
+        parser.add_argument('--orders', type=int, default=5000, help='Number of orders')
+        parser.add_argument('--regions', type=int, default=20, help='Number of regions')
+        parser.add_argument('--rounds', type=int, default=3, help='Assign calls per courier')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        """
+        Выполнение команды
+        :param args: аргументы
+        :param options: именованные аргументы
+        """
+        strategies = options['strategies'] or list(PACKERS)
+        for strategy in strategies:
+            if strategy not in PACKERS:
+                raise CommandError('Unknown strategy: "{0}"'.format(strategy))
+
+        row_format = '{0:<18}{1:>10}{2:>10}{3:>10}{4:>13}{5:>12}{6:>10}'
+        self.stdout.write(row_format.format(
+            'strategy', 'p50, ms', 'p95, ms', 'p99, ms',
+            'queries/call', 'kg/trip', 'backlog'))
+        for strategy in strategies:
+            result = self.__run(strategy, options)
+            self.stdout.write(row_format.format(
+                strategy,
+                '{0:.2f}'.format(Command.__percentile(result['latencies'], 50) * 1000.),
+                '{0:.2f}'.format(Command.__percentile(result['latencies'], 95) * 1000.),
+                '{0:.2f}'.format(Command.__percentile(result['latencies'], 99) * 1000.),
+                '{0:.1f}'.format(sum(result['queries']) / len(result['queries'])),
+                '{0:.2f}'.format(
+                    sum(result['weights']) / len(result['weights'])
+                    if len(result['weights']) > 0 else 0.),
+                result['backlog'],
+            ))
+
+    def __run(self, strategy, options):
+        """
+        Прогон одной стратегии
+        :param str strategy: имя стратегии
+        :param dict options: параметры команды
+        :return dict: задержки (с), число запросов к БД на вызов,
+            вес развозов (кг) и число оставшихся свободных заказов
+        """
+        result = {'latencies': list(), 'queries': list(), 'weights': list()}
+        factory = RequestFactory()
+        with transaction.atomic(), \
+                override_settings(CANDY_DELIVERY_PACKER=strategy):
+            courier_ids, order_ids = Command.__populate(
+                random.Random(options['seed']), options)
+            for _ in range(options['rounds']):
+                for courier_id in courier_ids:
+                    request = factory.post(
+                        '/orders/assign', json.dumps({'courier_id': courier_id}),
+                        content_type='application/json')
+                    with CaptureQueriesContext(connection) as context:
+                        start_time = time.perf_counter()
+                        response = AssignOrdersHandler().process(request)
+                        result['latencies'].append(time.perf_counter() - start_time)
+                    if response.status_code != 200:
+                        raise CommandError(response.content.decode())
+                    result['queries'].append(len(context.captured_queries))
+
+                # Все развозы раунда считаются выполненными
+                deliveries = models.Delivery.objects.filter(
+                    courier_id__in=courier_ids, is_complete=False)
+                result['weights'].extend(
+                    float(w) for w in deliveries.annotate(
+                        weight=Sum('order__weight')).values_list('weight', flat=True)
+                )
+                deliveries.update(is_complete=True)
+
+            result['backlog'] = models.Order.objects.filter(
+                id__in=order_ids, delivery=None).count()
+            transaction.set_rollback(True)
+        return result
+
+    @staticmethod
+    def __populate(rng, options):
+        """
+        Создание синтетических курьеров и заказов
+        :param random.Random rng: генератор случайных чисел
+        :param dict options: параметры команды
+        :return tuple(list(int), list(int)): id курьеров и id заказов
+        """
+        def random_interval(min_hours, max_hours):
+            start = rng.randint(6 * 60, 20 * 60)
+            end = min(start + rng.randint(min_hours * 60, max_hours * 60), 24 * 60 - 1)
+            return day_time(start // 60, start % 60), day_time(end // 60, end % 60)
+
+        regions = range(1, options['regions'] + 1)
+        courier_base = models.Courier.objects.aggregate(Max('id'))['id__max'] or 0
+        courier_ids = [courier_base + i for i in range(1, options['couriers'] + 1)]
+        order_base = models.Order.objects.aggregate(Max('id'))['id__max'] or 0
+        order_ids = [order_base + i for i in range(1, options['orders'] + 1)]
+
+        couriers, courier_regions, intervals = list(), list(), list()
+        for courier_id in courier_ids:
+            couriers.append(models.Courier(
+                id=courier_id, type=rng.choice(models.Courier.AllowedTypes.values)))
+            for number in rng.sample(regions, min(rng.randint(1, 4), len(regions))):
+                courier_regions.append(models.Region(number=number, courier_id=courier_id))
+            for _ in range(rng.randint(1, 2)):
+                min_time, max_time = random_interval(2, 8)
+                intervals.append(models.Interval(
+                    min_time=min_time, max_time=max_time, courier_id=courier_id))
+
+        orders = list()
+        for order_id in order_ids:
+            orders.append(models.Order(
+                id=order_id, region=rng.choice(regions),
+                weight=Decimal(rng.randint(1, 2000)) / 100))
+            for _ in range(rng.randint(1, 2)):
+                min_time, max_time = random_interval(1, 3)
+                intervals.append(models.Interval(
+                    min_time=min_time, max_time=max_time, order_id=order_id))
+
+        models.Courier.objects.bulk_create(couriers)
+        models.Region.objects.bulk_create(courier_regions)
+        models.Order.objects.bulk_create(orders)
+        models.Interval.objects.bulk_create(intervals)
+        return courier_ids, order_ids
+
+    @staticmethod
+    def __percentile(values, percent):
+        """
+        Вычисление процентиля (по ближайшему рангу)
+        :param list(float) values: значения
+        :param float percent: процентиль (0-100)
+        :return float: значение процентиля
+        """
+        values = sorted(values)
+        rank = max(math.ceil(percent / 100. * len(values)) - 1, 0)
+        return values[rank]
@@ -0,0 +1,119 @@
+import copy
+import time
+import random
+from django.core.management.base import BaseCommand, CommandError
+from ...handlers import ImportCouriersHandler, ImportOrdersHandler
+
+
+# =====================================================================================================================
+
+
+class Command(BaseCommand):
+    """
+    Сравнение способов проверки данных загрузки на синтетических
+    элементах запроса (в БД ничего не пишется)
+    """
+
+    help = 'Compares schema and model (full_clean) validation of import payloads'
+
+    # Обработчики загрузки по типам объектов
+    HANDLER_TYPES = {
+        'couriers': ImportCouriersHandler,
+        'orders': ImportOrdersHandler,
+    }
+
+    # Способы проверки данных
+    VALIDATORS = ('model', 'schema')
+
+    def add_arguments(self, parser):
+        """
+        Описание аргументов команды
+        :param parser: парсер аргументов
+        """
+        parser.add_argument(
+            'kinds', nargs='*',
+            help='Object kinds to validate: couriers, orders (by default both)',
+        )
+        parser.add_argument('--items', type=int, default=10000, help='Number of items')
+        parser.add_argument('--invalid', type=float, default=0.1, help='Share of invalid items')
+        parser.add_argument('--rounds', type=int, default=3, help='Runs per validator (best is reported)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed')
+
+    def handle(self, *args, **options):
+        """
+        Выполнение команды
+        :param args: аргументы
+        :param options: именованные аргументы
+        """
+        kinds = options['kinds'] or list(self.HANDLER_TYPES)
+        for kind in kinds:
+            if kind not in self.HANDLER_TYPES:
+                raise CommandError('Unknown kind: "{0}"'.format(kind))
+
+        row_format = '{0:<10}{1:<8}{2:>12}{3:>14}{4:>10}'
+        self.stdout.write(row_format.format(
+            'kind', 'validator', 'time, ms', 'items/s', 'invalid'))
+        for kind in kinds:
+            rng = random.Random(options['seed'])
+            items = [
+                Command.__create_item(rng, kind, i, rng.random() < options['invalid'])
+                for i in range(1, options['items'] + 1)
+            ]
+            invalid_ids = dict()
+            for validator in self.VALIDATORS:
+                best_time = None
+                for _ in range(options['rounds']):
+                    # Проверка методами моделей изменяет элементы
+                    items_copy = copy.deepcopy(items)
+                    start_time = time.perf_counter()
+                    results = self.HANDLER_TYPES[kind].init_objects(items_copy, validator)
+                    elapsed_time = time.perf_counter() - start_time
+                    if best_time is None or elapsed_time < best_time:
+                        best_time = elapsed_time
+                invalid_ids[validator] = [i for i, o in results if o is None]
+                self.stdout.write(row_format.format(
+                    kind, validator,
+                    '{0:.1f}'.format(best_time * 1000.),
+                    '{0:.0f}'.format(len(items) / best_time if best_time > 0 else 0.),
+                    len(invalid_ids[validator]),
+                ))
+            if invalid_ids['model'] != invalid_ids['schema']:
+                raise CommandError(
+                    'Validators disagree on {0}'.format(kind))
+
+    @staticmethod
+    def __create_item(rng, kind, object_id, invalid):
+        """
+        Создание синтетического элемента запроса
+        :param random.Random rng: генератор случайных чисел
+        :param str kind: тип объекта
+        :param int object_id: id объекта
+        :param bool invalid: флаг некорректного элемента
+        :return dict: элемент запроса
+        """
+        def random_interval():
+            start = rng.randint(6, 20)
+            return '{0:02d}:{1:02d}-{2:02d}:00'.format(
+                start, rng.choice((0, 15, 30)), rng.randint(start + 1, 23))
+
+        if kind == 'couriers':
+            item = {
+                'courier_id': object_id,
+                'courier_type': rng.choice(('foot', 'bike', 'car')),
+                'regions': rng.sample(range(1, 30), rng.randint(1, 4)),
+                'working_hours': [random_interval() for _ in range(rng.randint(1, 3))],
+            }
+            broken = {'courier_type': 'plane', 'regions': [0], 'working_hours': ['18:00-09:00']}
+        else:
+            item = {
+                'order_id': object_id,
+                'weight': rng.randint(1, 5000) / 100,
+                'region': rng.randint(1, 30),
+                'delivery_hours': [random_interval() for _ in range(rng.randint(1, 2))],
+            }
+            broken = {'weight': 0.001, 'region': -1, 'delivery_hours': []}
+
+        if invalid:
+            key = rng.choice(list(broken))
+            item[key] = broken[key]
+        return item
@@ -0,0 +1,38 @@
+import time
+from django.core.management.base import BaseCommand
+from ...assignment import DeliveryPlanner
+
+
+# =====================================================================================================================
+
+
+class Command(BaseCommand):
+    """
+    Фоновый планировщик следующих развозов
+    """
+
+    help = 'Reserves orders for the next delivery of every courier without an incomplete delivery'
+
+    def add_arguments(self, parser):
+        """
+        Описание аргументов команды
+        :param parser: парсер аргументов
+        """
+        parser.add_argument(
+            '--interval', type=float, default=0.,
+            help='Replanning interval in seconds (by default plans once and exits)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Выполнение команды
+        :param args: аргументы
+        :param options: именованные аргументы
+        """
+        planner = DeliveryPlanner()
+        while True:
+            n_reserved = planner.plan()
+            self.stdout.write('Reserved orders: {0}'.format(n_reserved))
+            if options['interval'] <= 0.:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,45 @@
+import time
+from django.core.management.base import BaseCommand
+from ...import_jobs import ImportJobRunner
+
+
+# =====================================================================================================================
+
+
+class Command(BaseCommand):
+    """
+    Обработчик очереди заданий на асинхронную загрузку
+    """
+
+    help = 'Runs queued asynchronous courier/order imports'
+
+    def add_arguments(self, parser):
+        """
+        Описание аргументов команды
+        :param parser: парсер аргументов
+        """
+        parser.add_argument(
+            '--interval', type=float, default=0.,
+            help='Queue polling interval in seconds (by default empties the queue once and exits)',
+        )
+
+    def handle(self, *args, **options):
+        """
+        Выполнение команды
+        :param args: аргументы
+        :param options: именованные аргументы
+        """
+        runner = ImportJobRunner()
+        try:
+            while True:
+                n_stale = runner.fail_stale()
+                if n_stale > 0:
+                    self.stdout.write('Failed stale imports: {0}'.format(n_stale))
+                n_jobs = runner.run_all()
+                if n_jobs > 0:
+                    self.stdout.write('Processed imports: {0}'.format(n_jobs))
+                if options['interval'] <= 0.:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            runner.close()
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.7 on 2026-10-18 18:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0003_auto_20210327_1309'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='delivery',
+            constraint=models.UniqueConstraint(condition=models.Q(is_complete=False), fields=('courier',), name='unique_incomplete_delivery'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.1.7 on 2026-10-18 18:51
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0006_reservation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='create_time',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.1.7 on 2026-10-18 18:58
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0007_order_create_time'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('couriers', 'Couriers'), ('orders', 'Orders')], max_length=8)),
+                ('content_format', models.CharField(choices=[('json', 'Json'), ('ndjson', 'Ndjson'), ('csv', 'Csv')], max_length=6)),
+                ('payload', models.BinaryField()),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=7)),
+                ('n_processed', models.IntegerField(default=0)),
+                ('result_status', models.IntegerField(null=True)),
+                ('result', models.JSONField(null=True)),
+                ('create_time', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finish_time', models.DateTimeField(null=True)),
+            ],
+        ),
+    ]
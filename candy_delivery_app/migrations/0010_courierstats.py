@@ -0,0 +1,49 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:08
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_courier_stats(apps, schema_editor):
+    """
+    Заполнение статистики курьеров по уже завершенным развозам
+    """
+    Delivery = apps.get_model('candy_delivery_app', 'Delivery')
+    Order = apps.get_model('candy_delivery_app', 'Order')
+    CourierStats = apps.get_model('candy_delivery_app', 'CourierStats')
+
+    stats = dict()
+    for courier_id, earnings_factor_sum in Delivery.objects.filter(
+            is_complete=True).values('courier_id').annotate(
+            factor_sum=models.Sum('earnings_factor')).values_list(
+            'courier_id', 'factor_sum'):
+        stats[courier_id] = CourierStats(
+            courier_id=courier_id, earnings_factor_sum=earnings_factor_sum,
+            region_durations=dict())
+    for courier_id, region, duration, n_orders in Order.objects.filter(
+            delivery__is_complete=True).values(
+            'delivery__courier_id', 'region').annotate(
+            duration=models.Sum('delivery_duration'),
+            n_orders=models.Count('delivery_duration')).values_list(
+            'delivery__courier_id', 'region', 'duration', 'n_orders'):
+        stats[courier_id].region_durations[str(region)] = [duration or 0., n_orders]
+    CourierStats.objects.bulk_create(stats.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0009_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourierStats',
+            fields=[
+                ('courier', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='candy_delivery_app.courier')),
+                ('earnings_factor_sum', models.IntegerField(default=0)),
+                ('region_durations', models.JSONField(default=dict)),
+            ],
+        ),
+        migrations.RunPython(fill_courier_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0010_courierstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='started_time',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0011_importjob_started_time'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='generation',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.7 on 2026-10-18 19:38
+
+from django.db import migrations, models
+
+
+def fill_heartbeat_time(apps, schema_editor):
+    """
+    Время подтверждения для заданий в обработке - по времени начала
+    """
+    ImportJob = apps.get_model('candy_delivery_app', 'ImportJob')
+    ImportJob.objects.filter(status='running').update(
+        heartbeat_time=models.F('started_time'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('candy_delivery_app', '0012_reservation_generation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='heartbeat_time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(fill_heartbeat_time, migrations.RunPython.noop),
+    ]
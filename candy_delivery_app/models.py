@@ -1,7 +1,9 @@
 import re
+import uuid
 from datetime import time
+from functools import lru_cache
 from decimal import Decimal
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
@@ -34,6 +36,11 @@ class Courier(models.Model):
         max_length=4, choices=AllowedTypes.choices,
     )
 
+    # Хэш загруженных данных (тип, районы, рабочие часы)
+    content_hash = models.CharField(
+        max_length=32, blank=True, default='',
+    )
+
     @property
     def max_weight(self):
         """
@@ -87,6 +94,16 @@ class Delivery(models.Model):
         default=False
     )
 
+    class Meta:
+        constraints = [
+            # У курьера не более одного незавершенного развоза
+            models.UniqueConstraint(
+                fields=['courier'],
+                condition=models.Q(is_complete=False),
+                name='unique_incomplete_delivery',
+            ),
+        ]
+
     def update_complete(self):
         """
         Проверка и обновление
@@ -94,8 +111,100 @@ class Delivery(models.Model):
         """
         incomplete_orders = self.order_set.filter(
             complete_time=None)
-        self.is_complete = len(incomplete_orders) == 0
-        self.save()
+        if len(incomplete_orders) == 0:
+            self.complete()
+        else:
+            self.is_complete = False
+            self.save()
+
+    def complete(self):
+        """
+        Завершение развоза с учетом его в статистике курьера
+        (статистика обновляется только при первом завершении)
+        """
+        with transaction.atomic():
+            completed = Delivery.objects.filter(
+                id=self.id, is_complete=False).update(is_complete=True) > 0
+            self.is_complete = True
+            self.save()
+            if completed:
+                CourierStats.add_delivery(self)
+
+
+# =====================================================================================================================
+
+
+class CourierStats(models.Model):
+    """
+    Статистика курьера по завершенным развозам
+    (обновляется при завершении развоза)
+    """
+
+    # Курьер
+    courier = models.OneToOneField(
+        Courier, primary_key=True, on_delete=models.CASCADE,
+        related_name='stats',
+    )
+
+    # Сумма коэффициентов для расчета заработка
+    earnings_factor_sum = models.IntegerField(
+        default=0,
+    )
+
+    # Суммарное время доставки и число заказов по районам:
+    # {"номер района": [время в секундах, число заказов]}
+    region_durations = models.JSONField(
+        default=dict,
+    )
+
+    # Оплата за единицу коэффициента заработка
+    EARNINGS_UNIT = 500
+
+    # Время доставки, при котором рейтинг равен нулю (в секундах)
+    MAX_RATED_DURATION = 3600.
+
+    @classmethod
+    def add_delivery(cls, delivery):
+        """
+        Учет завершенного развоза в статистике курьера
+        (должен выполняться в транзакции)
+        :param Delivery delivery: развоз
+        """
+        stats, _ = cls.objects.select_for_update().get_or_create(
+            courier_id=delivery.courier_id)
+        stats.earnings_factor_sum += delivery.earnings_factor
+        for region, duration, n_orders in delivery.order_set.values(
+                'region').annotate(
+                duration=models.Sum('delivery_duration'),
+                n_orders=models.Count('delivery_duration')).values_list(
+                'region', 'duration', 'n_orders'):
+            totals = stats.region_durations.setdefault(str(region), [0., 0])
+            totals[0] += duration or 0.
+            totals[1] += n_orders
+        stats.save()
+
+    def get_earnings(self):
+        """
+        Расчет заработка курьера
+        :return int: заработок
+        """
+        return self.earnings_factor_sum * self.EARNINGS_UNIT
+
+    def get_rating(self):
+        """
+        Расчет рейтинга курьера по наименьшему
+        среднему времени доставки в районе
+        :return float | None: рейтинг (None, если заказов еще не было)
+        """
+        averages = [
+            duration / n_orders
+            for duration, n_orders in self.region_durations.values()
+            if n_orders > 0
+        ]
+        if len(averages) == 0:
+            return None
+        t = min(min(averages), self.MAX_RATED_DURATION)
+        return 5. * (self.MAX_RATED_DURATION - t) / self.MAX_RATED_DURATION
 
 
 # =====================================================================================================================
@@ -127,6 +236,11 @@ class Order(models.Model):
         validators=[MinValueValidator(1)],
     )
 
+    # Хэш загруженных данных (вес, район, часы доставки)
+    content_hash = models.CharField(
+        max_length=32, blank=True, default='',
+    )
+
     # Развоз
     delivery = models.ForeignKey(
         Delivery,
@@ -136,6 +250,11 @@ class Order(models.Model):
         on_delete=models.SET_NULL,
     )
 
+    # Время создания заказа
+    create_time = models.DateTimeField(
+        default=timezone.now
+    )
+
     # Время выполнения заказа
     complete_time = models.DateTimeField(
         null=True,
@@ -150,6 +269,41 @@ class Order(models.Model):
         default=None,
     )
 
+    # Резерв (предварительно подобранный развоз)
+    reservation = models.ForeignKey(
+        'Reservation',
+        null=True,
+        blank=True,
+        default=None,
+        on_delete=models.SET_NULL,
+    )
+
+
+# =====================================================================================================================
+
+
+class Reservation(models.Model):
+    """
+    Резерв заказов для следующего развоза курьера
+    (формируется фоновым планировщиком)
+    """
+
+    # Курьер
+    courier = models.OneToOneField(
+        Courier, primary_key=True, on_delete=models.CASCADE,
+    )
+
+    # Время формирования резерва
+    create_time = models.DateTimeField(
+        default=timezone.now
+    )
+
+    # Номер прохода планировщика, сформировавшего резерв
+    # (резервы предыдущих проходов удаляются в конце прохода)
+    generation = models.IntegerField(
+        default=0,
+    )
+
 
 # =====================================================================================================================
 
@@ -256,6 +410,32 @@ class Interval(models.Model):
         else:
             return True
 
+    @staticmethod
+    def mask_of(intervals):
+        """
+        Получение битовой маски минут суток, покрываемых интервалами
+        (бит i соответствует i-й минуте от начала суток);
+        пересечение двух наборов интервалов - ненулевое AND их масок
+        :param list(Interval) intervals: список интервалов
+        :return int: битовая маска
+        """
+        return _compile_minutes_mask(tuple(
+            (i.min_time, i.max_time) for i in intervals
+        ))
+
+    @staticmethod
+    def parse_bounds(string):
+        """
+        Разбор строки формата '%H:%M-%H:%M' (без исключений; результаты
+        кэшируются - на практике почти все интервалы описываются
+        несколькими десятками строк)
+        :param str string: строка
+        :return tuple: ((начало, конец), None) или (None, текст ошибки)
+        """
+        if type(string) is not str:
+            return None, 'Unsupported string type'
+        return _parse_interval_bounds(string)
+
     @classmethod
     def from_string(cls, string, *, courier_fk=None, order_fk=None):
         """
@@ -265,18 +445,11 @@ class Interval(models.Model):
         :param int | Order | None order_fk: внешний ключ на заказ
         :return Interval: интервал
         """
-        match = re.compile(
-            '^([0-9]{2}:[0-9]{2})-([0-9]{2}:[0-9]{2})$').search(string)
-        if match is None:
-            raise ValidationError('Unsupported string format')
+        bounds, error = Interval.parse_bounds(string)
+        if error is not None:
+            raise ValidationError(error)
 
-        try:
-            i = Interval(
-                min_time=time.fromisoformat(match.groups()[0]),
-                max_time=time.fromisoformat(match.groups()[1])
-            )
-        except ValueError as e:
-            raise ValidationError(str(e)) from e
+        i = Interval(min_time=bounds[0], max_time=bounds[1])
 
         if courier_fk is not None:
             i.courier = courier_fk
@@ -304,3 +477,187 @@ class Interval(models.Model):
             raise ValidationError(
                 '"string_list" must be an iterable'
             ) from e
+
+
+# =====================================================================================================================
+
+
+class DataVersion(models.Model):
+    """
+    Версия набора данных
+    (для проверки актуальности данных, кэшированных в памяти процессов)
+    """
+
+    # Имя набора данных
+    name = models.CharField(
+        max_length=32, primary_key=True,
+    )
+
+    # Текущая версия
+    version = models.CharField(
+        max_length=32,
+    )
+
+    @classmethod
+    def get_version(cls, name):
+        """
+        Получение текущей версии набора данных
+        :param str name: имя набора данных
+        :return str | None: версия (None, если версия не задавалась)
+        """
+        return cls.objects.filter(name=name).values_list(
+            'version', flat=True).first()
+
+    @classmethod
+    def bump(cls, name, expected_version=None):
+        """
+        Смена версии набора данных
+        :param str name: имя набора данных
+        :param str | None expected_version: ожидаемая текущая версия
+            (если задана, версия меняется только при совпадении)
+        :return str | None: новая версия (None, если текущая
+            версия не совпала с ожидаемой)
+        """
+        version = uuid.uuid4().hex
+        queryset = cls.objects.filter(name=name)
+        if expected_version is not None:
+            queryset = queryset.filter(version=expected_version)
+            return version if queryset.update(version=version) > 0 else None
+        if queryset.update(version=version) == 0:
+            cls.objects.update_or_create(
+                name=name, defaults={'version': version})
+        return version
+
+
+# =====================================================================================================================
+
+
+# Формат строкового представления интервала
+_INTERVAL_PATTERN = re.compile('^([0-9]{2}:[0-9]{2})-([0-9]{2}:[0-9]{2})$')
+
+
+@lru_cache(maxsize=4096)
+def _parse_interval_bounds(string):
+    """
+    Разбор строки формата '%H:%M-%H:%M' (с кэшированием)
+    :param str string: строка
+    :return tuple: ((начало, конец), None) или (None, текст ошибки)
+    """
+    match = _INTERVAL_PATTERN.search(string)
+    if match is None:
+        return None, 'Unsupported string format'
+    try:
+        return (time.fromisoformat(match.group(1)),
+                time.fromisoformat(match.group(2))), None
+    except ValueError as e:
+        return None, str(e)
+
+
+@lru_cache(maxsize=4096)
+def _compile_minutes_mask(bounds):
+    """
+    Формирование битовой маски минут суток (с кэшированием)
+    :param tuple(tuple(time, time)) bounds: границы интервалов
+    :return int: битовая маска
+    """
+    mask = 0
+    for min_time, max_time in bounds:
+        min_minute = min_time.hour * 60 + min_time.minute
+        max_minute = max_time.hour * 60 + max_time.minute
+        if max_minute > min_minute:
+            mask |= ((1 << (max_minute - min_minute)) - 1) << min_minute
+    return mask
+
+
+# =====================================================================================================================
+
+
+class ImportJob(models.Model):
+    """
+    Задание на асинхронную загрузку курьеров/заказов
+    (очередь заданий, обрабатываемая командой process_imports)
+    """
+
+    class AllowedKinds(models.TextChoices):
+        """
+        Возможные типы загружаемых объектов
+        """
+        COURIERS = 'couriers'
+        ORDERS = 'orders'
+
+    class AllowedFormats(models.TextChoices):
+        """
+        Возможные форматы содержимого
+        """
+        JSON = 'json'
+        NDJSON = 'ndjson'
+        CSV = 'csv'
+
+    class AllowedStatuses(models.TextChoices):
+        """
+        Возможные состояния задания
+        """
+        QUEUED = 'queued'
+        RUNNING = 'running'
+        DONE = 'done'
+        FAILED = 'failed'
+
+    # Тип загружаемых объектов
+    kind = models.CharField(
+        max_length=8, choices=AllowedKinds.choices,
+    )
+
+    # Формат содержимого
+    content_format = models.CharField(
+        max_length=6, choices=AllowedFormats.choices,
+    )
+
+    # Содержимое запроса (очищается после обработки)
+    payload = models.BinaryField()
+
+    # Флаг загрузки в режиме upsert
+    upsert = models.BooleanField(
+        default=False,
+    )
+
+    # Состояние задания
+    status = models.CharField(
+        max_length=7, choices=AllowedStatuses.choices,
+        default=AllowedStatuses.QUEUED, db_index=True,
+    )
+
+    # Число проверенных элементов
+    n_processed = models.IntegerField(
+        default=0,
+    )
+
+    # Статус ответа на запрос загрузки
+    result_status = models.IntegerField(
+        null=True,
+    )
+
+    # Содержимое ответа на запрос загрузки
+    result = models.JSONField(
+        null=True,
+    )
+
+    # Время создания
+    create_time = models.DateTimeField(
+        default=timezone.now,
+    )
+
+    # Время начала обработки
+    started_time = models.DateTimeField(
+        null=True,
+    )
+
+    # Время последнего подтверждения хода обработки
+    # (обновляется обработчиком по мере проверки и записи)
+    heartbeat_time = models.DateTimeField(
+        null=True,
+    )
+
+    # Время завершения
+    finish_time = models.DateTimeField(
+        null=True,
+    )
@@ -2,5 +2,12 @@ from .import_couriers_test import *
 from .update_courier_test import *
 from .import_orders_test import *
 from .assign_orders_test import *
+from .assign_orders_batch_test import *
 from .complete_order_test import *
 from .get_courier_info_test import *
+from .benchmark_assignment_test import *
+from .benchmark_validation_test import *
+from .json_stream_test import *
+from .import_jobs_test import *
+from .interval_test import *
+from .get_couriers_info_test import *
@@ -0,0 +1,167 @@
+import json
+from pyrfc3339 import generate
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from ..models import *
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'AssignOrdersBatchTest',
+]
+
+
+# =====================================================================================================================
+
+
+class AssignOrdersBatchTest(TestCase):
+    """
+    Тесты назначения заказов нескольким курьерам
+    """
+
+    # Отключить ограничение на вывод
+    maxDiff = None
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Инициализация тестовых данных
+        """
+        # Курьер 1
+        Courier.objects.create(id=1, type='foot')
+        Region.objects.create(number=1, courier_id=1)
+        Region.objects.create(number=3, courier_id=1)
+        Interval.objects.create(min_time='09:00', max_time='10:00', courier_id=1)
+
+        # Курьер 2
+        Courier.objects.create(id=2, type='bike')
+        Region.objects.create(number=3, courier_id=2)
+        Region.objects.create(number=4, courier_id=2)
+        Interval.objects.create(min_time='09:00', max_time='10:00', courier_id=2)
+        Interval.objects.create(min_time='12:00', max_time='18:00', courier_id=2)
+
+        # Курьер 3
+        Courier.objects.create(id=3, type='car')
+        Region.objects.create(number=3, courier_id=3)
+        Interval.objects.create(min_time='08:00', max_time='11:00', courier_id=3)
+
+    def _post_assign_batch(self, courier_ids):
+        """
+        Отправка запроса на сервер
+        """
+        if courier_ids is None:
+            data = json.dumps({})
+        else:
+            data = json.dumps({'courier_ids': courier_ids})
+        return self.client.post(
+            '/orders/assign/batch', data, 'application/json')
+
+    def test_bad_request(self):
+        """
+        Некорректные запросы
+        """
+        self.assertEqual(self._post_assign_batch(None).status_code, 400)
+        self.assertEqual(self._post_assign_batch(1).status_code, 400)
+        self.assertEqual(self._post_assign_batch([1, '2']).status_code, 400)
+        self.assertEqual(self._post_assign_batch([1, 1]).status_code, 400)
+        self.assertEqual(self._post_assign_batch([1, 100500]).status_code, 400)
+
+    def test_assign_batch(self):
+        """
+        Назначение нескольким курьерам из общего пула
+        """
+        Order.objects.create(id=1, weight=Decimal('5'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=1)  # -> 1
+        Order.objects.create(id=2, weight=Decimal('4.51'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=2)  # -> 1
+        Order.objects.create(id=3, weight=Decimal('0.49'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=3)  # -> 1
+        Order.objects.create(id=4, weight=Decimal('8.01'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=4)  # -> 2
+        Order.objects.create(id=5, weight=Decimal('6.98'), region=4)
+        Interval.objects.create(min_time='13:00', max_time='14:00', order_id=5)  # -> 2
+        Order.objects.create(id=6, weight=Decimal('30.55'), region=3)
+        Interval.objects.create(min_time='10:30', max_time='11:30', order_id=6)  # -> 3
+        Order.objects.create(id=7, weight=Decimal('1'), region=5)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=7)  # -> x
+
+        response = self._post_assign_batch([1, 2, 3])
+        self.assertEqual(response.status_code, 200)
+        content = json.loads(response.content)
+        self.assertEqual(
+            [(c['courier_id'], c['orders']) for c in content['couriers']], [
+                (1, [{'id': 3}, {'id': 2}, {'id': 1}]),
+                (2, [{'id': 5}, {'id': 4}]),
+                (3, [{'id': 6}]),
+            ]
+        )
+        for c in content['couriers']:
+            delivery = Delivery.objects.get(courier_id=c['courier_id'])
+            self.assertEqual(
+                c['assign_time'],
+                generate(delivery.assign_time, utc=False, microseconds=True)
+            )
+            self.assertEqual(
+                sorted(o.id for o in delivery.order_set.all()),
+                sorted(o['id'] for o in c['orders'])
+            )
+        self.assertIsNone(Order.objects.get(id=7).delivery)
+
+        # Повторный запрос возвращает те же развозы
+        response = self._post_assign_batch([1, 2, 3])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), content)
+
+    def test_assign_batch_with_incomplete_delivery(self):
+        """
+        Назначение при незавершенном развозе одного из курьеров
+        """
+        Order.objects.create(id=1, weight=Decimal('1'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='09:30', order_id=1)
+
+        delivery = Delivery.objects.create(courier_id=1, earnings_factor=2)
+        delivery.order_set.create(id=2, weight=Decimal('1'), region=1)
+
+        response = self._post_assign_batch([1, 2])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['couriers'][0], {
+                'courier_id': 1,
+                'orders': [{'id': 2}],
+                'assign_time': generate(
+                    delivery.assign_time, utc=False, microseconds=True
+                ),
+            }
+        )
+        self.assertEqual(
+            json.loads(response.content)['couriers'][1]['orders'], [{'id': 1}]
+        )
+
+    def _count_assign_batch_queries(self, n_orders):
+        """
+        Подсчет запросов к БД при назначении заказов
+        """
+        Order.objects.all().delete()
+        Delivery.objects.all().delete()
+        for i in range(1, n_orders + 1):
+            Order.objects.create(id=i, weight=Decimal('0.1'), region=3)
+            Interval.objects.create(min_time='09:00', max_time='10:00', order_id=i)
+        with CaptureQueriesContext(connection) as context:
+            response = self._post_assign_batch([1, 2, 3])
+        self.assertEqual(
+            sum(len(c['orders']) for c in json.loads(response.content)['couriers']),
+            n_orders
+        )
+        return len(context.captured_queries)
+
+    def test_assign_batch_constant_queries(self):
+        """
+        Число запросов к БД не зависит от количества заказов
+        """
+        self.assertEqual(
+            self._count_assign_batch_queries(10),
+            self._count_assign_batch_queries(60)
+        )
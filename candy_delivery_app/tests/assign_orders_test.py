@@ -1,7 +1,17 @@
 import json
+from io import StringIO
+from unittest import mock
+from datetime import timedelta
 from pyrfc3339 import generate
-from django.test import TestCase
+from django.db import connection, transaction, IntegrityError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
 from ..models import *
+from ..handlers import AssignOrdersHandler
+from ..wrappers import CourierWrapper
+from ..assignment import FreeOrderIndex, free_order_index, KnapsackPacker
 
 
 # =====================================================================================================================
@@ -9,6 +19,8 @@ from ..models import *
 
 __all__ = [
     'AssignOrdersTest',
+    'AssignOrdersWithIndexTest',
+    'AssignOrdersWithReservationsTest',
 ]
 
 
@@ -169,9 +181,10 @@ class AssignOrdersTest(TestCase):
             ]
         )
 
-    def test_assign_by_weight(self):
+    def _assign_by_weight(self):
         """
-        Назначение по весу
+        Назначение по весу (курьерам 1 и 2),
+        возвращает ответ на назначение курьеру 3
         """
         Order.objects.create(id=1, weight=Decimal('5'), region=3)
         Interval.objects.create(min_time='00:00', max_time='23:59', order_id=1)  # -> 1
@@ -184,9 +197,9 @@ class AssignOrdersTest(TestCase):
         Order.objects.create(id=5, weight=Decimal('6.98'), region=3)
         Interval.objects.create(min_time='00:00', max_time='23:59', order_id=5)  # -> 2
         Order.objects.create(id=6, weight=Decimal('30.55'), region=3)
-        Interval.objects.create(min_time='00:00', max_time='23:59', order_id=6)  # -> x
+        Interval.objects.create(min_time='00:00', max_time='23:59', order_id=6)  # -> 3 (knapsack)
         Order.objects.create(id=7, weight=Decimal('25.15'), region=3)
-        Interval.objects.create(min_time='00:00', max_time='23:59', order_id=7)  # -> 3
+        Interval.objects.create(min_time='00:00', max_time='23:59', order_id=7)  # -> 3 (greedy)
 
         response = self._post_assign(1)
         self.assertEqual(response.status_code, 200)
@@ -209,12 +222,93 @@ class AssignOrdersTest(TestCase):
 
         response = self._post_assign(3)
         self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_assign_by_weight(self):
+        """
+        Назначение по весу (развоз максимального веса)
+        """
+        response = self._assign_by_weight()
+        self.assertEqual(
+            json.loads(response.content)['orders'], [
+                {'id': 6},
+            ]
+        )
+
+    @override_settings(CANDY_DELIVERY_PACKER='greedy')
+    def test_assign_by_weight_greedy(self):
+        """
+        Назначение по весу (жадный алгоритм)
+        """
+        response = self._assign_by_weight()
+        self.assertEqual(
+            json.loads(response.content)['orders'], [
+                {'id': 7},
+            ]
+        )
+
+    @override_settings(CANDY_DELIVERY_PACKER_TIME_BUDGET=0.)
+    def test_assign_by_weight_timeout(self):
+        """
+        Назначение по весу (лимит времени исчерпан - жадный алгоритм)
+        """
+        response = self._assign_by_weight()
         self.assertEqual(
             json.loads(response.content)['orders'], [
                 {'id': 7},
             ]
         )
 
+    def test_packer_stops_at_heavy_order(self):
+        """
+        Кандидаты тяжелее развоза не читаются (перебор прекращается)
+        """
+        n_read = list()
+
+        def candidates():
+            for i, weight in enumerate(['3', '4', '6', '11', '12', '13'], 1):
+                n_read.append(i)
+                yield Order(id=i, weight=Decimal(weight), region=1)
+
+        orders = KnapsackPacker().pack(candidates(), Decimal('10'))
+        self.assertEqual([o.id for o in orders], [2, 3])
+        self.assertEqual(len(n_read), 4)
+
+    @override_settings(CANDY_DELIVERY_PACKER='oldest_first')
+    def test_assign_oldest_first(self):
+        """
+        Назначение в порядке создания заказов
+        """
+        now = timezone.now()
+        Order.objects.create(id=1, weight=Decimal('4'), region=1,
+                             create_time=now - timedelta(minutes=1))
+        Order.objects.create(id=2, weight=Decimal('7'), region=2,
+                             create_time=now - timedelta(minutes=3))
+        Order.objects.create(id=3, weight=Decimal('3'), region=3,
+                             create_time=now - timedelta(minutes=2))
+        for i in range(1, 4):
+            Interval.objects.create(min_time='09:00', max_time='10:00', order_id=i)
+
+        response = self._post_assign(1)
+        self.assertEqual(
+            json.loads(response.content)['orders'], [{'id': 3}, {'id': 2}])
+
+    @override_settings(CANDY_DELIVERY_PACKER='region_clustered')
+    def test_assign_region_clustered(self):
+        """
+        Назначение с группировкой по районам
+        """
+        Order.objects.create(id=1, weight=Decimal('1'), region=1)
+        Order.objects.create(id=2, weight=Decimal('4'), region=2)
+        Order.objects.create(id=3, weight=Decimal('5'), region=2)
+        Order.objects.create(id=4, weight=Decimal('2'), region=3)  # жадно: 1, 4, 2
+        for i in range(1, 5):
+            Interval.objects.create(min_time='09:00', max_time='10:00', order_id=i)
+
+        response = self._post_assign(1)
+        self.assertEqual(
+            json.loads(response.content)['orders'], [{'id': 1}, {'id': 2}, {'id': 3}])
+
     def test_assign_with_incomplete_delivery(self):
         """
         Назначение при незавершенном заказе
@@ -243,3 +337,282 @@ class AssignOrdersTest(TestCase):
                 ),
             }
         )
+
+    def test_assign_by_chunks(self):
+        """
+        Назначение при постраничной загрузке кандидатов
+        """
+        for i in range(1, 8):
+            Order.objects.create(id=i, weight=Decimal('1.5'), region=3)
+            Interval.objects.create(min_time='09:30', max_time='09:45', order_id=i)
+        Order.objects.create(id=8, weight=Decimal('0.5'), region=4)
+        Interval.objects.create(min_time='09:30', max_time='09:45', order_id=8)
+
+        chunk_size = AssignOrdersHandler._CANDIDATES_CHUNK_SIZE
+        AssignOrdersHandler._CANDIDATES_CHUNK_SIZE = 2
+        try:
+            response = self._post_assign(1)
+        finally:
+            AssignOrdersHandler._CANDIDATES_CHUNK_SIZE = chunk_size
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)['orders'], [
+                {'id': 1},
+                {'id': 2},
+                {'id': 3},
+                {'id': 4},
+                {'id': 5},
+                {'id': 6},
+            ]
+        )
+
+    def _count_assign_queries(self, n_orders, weight, n_expected):
+        """
+        Подсчет запросов к БД при назначении заказов
+        """
+        Order.objects.all().delete()
+        Delivery.objects.all().delete()
+        for i in range(1, n_orders + 1):
+            Order.objects.create(id=i, weight=Decimal(weight), region=1)
+            Interval.objects.create(min_time='09:00', max_time='10:00', order_id=i)
+        FreeOrderIndex.notify_changed()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/orders/assign', json.dumps({'courier_id': 1}), 'application/json')
+        self.assertEqual(len(json.loads(response.content)['orders']), n_expected)
+        return len(context.captured_queries)
+
+    def test_assign_constant_queries(self):
+        """
+        Число запросов к БД не зависит ни от количества
+        просмотренных, ни от количества назначенных заказов
+        """
+        n_queries = self._count_assign_queries(5, '3', 3)
+        self.assertEqual(self._count_assign_queries(50, '3', 3), n_queries)
+        self.assertEqual(self._count_assign_queries(50, '0.5', 20), n_queries)
+
+    def test_single_incomplete_delivery(self):
+        """
+        У курьера не может быть двух незавершенных развозов
+        """
+        Delivery.objects.create(courier_id=1, earnings_factor=1)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Delivery.objects.create(courier_id=1, earnings_factor=1)
+        Delivery.objects.create(courier_id=1, earnings_factor=1, is_complete=True)
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_FREE_ORDER_INDEX=True)
+class AssignOrdersWithIndexTest(AssignOrdersTest):
+    """
+    Тесты назначения заказов курьерам
+    с использованием индекса свободных заказов
+    """
+
+    def setUp(self):
+        """
+        Инициализация
+        """
+        free_order_index.invalidate()
+
+    def test_index_without_order_queries(self):
+        """
+        Назначение по актуальному индексу не читает таблицу заказов
+        """
+        response = self.client.post('/orders', json.dumps({'data': [
+            {'order_id': 1, 'weight': 1, 'region': 1, 'delivery_hours': ['09:00-10:00']},
+            {'order_id': 2, 'weight': 1, 'region': 4, 'delivery_hours': ['09:00-10:00']},
+        ]}), 'application/json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 1}])
+
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/orders/assign', json.dumps({'courier_id': 2}), 'application/json')
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 2}])
+        for query in context.captured_queries:
+            self.assertFalse(
+                query['sql'].startswith('SELECT') and
+                'FROM "candy_delivery_app_order"' in query['sql'],
+                query['sql']
+            )
+
+    def test_assign_keeps_version(self):
+        """
+        Назначение не меняет версию набора свободных заказов
+        (индексы других процессов не перезагружаются)
+        """
+        response = self.client.post('/orders', json.dumps({'data': [
+            {'order_id': 1, 'weight': 1, 'region': 1, 'delivery_hours': ['09:00-10:00']},
+        ]}), 'application/json')
+        self.assertEqual(response.status_code, 201)
+        version = DataVersion.get_version(FreeOrderIndex.VERSION_NAME)
+        self.assertIsNotNone(version)
+
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 1}])
+        response = self._post_assign(2)
+        self.assertEqual(json.loads(response.content)['orders'], [])
+        self.assertEqual(DataVersion.get_version(FreeOrderIndex.VERSION_NAME), version)
+
+    def test_conflict_keeps_index(self):
+        """
+        Заказ, назначенный другим процессом, исключается из индекса,
+        остальные выбранные заказы возвращаются в индекс
+        """
+        for i in (1, 2):
+            Order.objects.create(id=i, weight=Decimal('1'), region=4)
+            Interval.objects.create(min_time='09:00', max_time='10:00', order_id=i)
+        FreeOrderIndex.notify_changed()
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [])
+
+        # Назначение в обход индекса (другим процессом)
+        Order.objects.filter(id=1).update(delivery=Delivery.objects.create(
+            courier_id=3, earnings_factor=9))
+        # (TestCase не фиксирует транзакции - обработчики
+        # фиксации выполняются сразу)
+        with CaptureQueriesContext(connection) as context, mock.patch.object(
+                transaction, 'on_commit', side_effect=lambda func: func()):
+            response = self.client.post(
+                '/orders/assign', json.dumps({'courier_id': 2}), 'application/json')
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 2}])
+        self.assertFalse(any(
+            'candy_delivery_app_dataversion' in q['sql'] and not q['sql'].startswith('SELECT')
+            for q in context.captured_queries
+        ))
+        self.assertIsNotNone(free_order_index._pool)
+        self.assertEqual(
+            list(free_order_index._pool.candidates(CourierWrapper.select(2))), [])
+
+    def test_rollback_keeps_index(self):
+        """
+        Заказы не исключаются из индекса при откате транзакции назначения,
+        а выбранные по индексу - возвращаются (индекс сбрасывается)
+        """
+        Order.objects.create(id=1, weight=Decimal('1'), region=4)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        FreeOrderIndex.notify_changed()
+        cw = CourierWrapper.select(2)
+        self.assertEqual(
+            [o.id for o in free_order_index.select([cw], KnapsackPacker())[2]], [1])
+        free_order_index.release([Order.objects.get(id=1)])
+
+        with self.assertRaises(RuntimeError):
+            with free_order_index.atomic():
+                free_order_index.take([Order.objects.get(id=1)])
+                raise RuntimeError('Rollback')
+        self.assertIsNone(free_order_index._pool)
+        self.assertEqual(
+            [o.id for o in free_order_index.select([cw], KnapsackPacker())[2]], [1])
+
+    def test_stale_index(self):
+        """
+        Назначение по устаревшему индексу (заказ назначен в обход индекса)
+        """
+        Order.objects.create(id=1, weight=Decimal('1'), region=4)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        Order.objects.create(id=2, weight=Decimal('2'), region=4)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=2)
+        FreeOrderIndex.notify_changed()
+
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [])
+
+        Order.objects.filter(id=1).update(delivery=Delivery.objects.create(
+            courier_id=3, earnings_factor=9))
+        response = self._post_assign(2)
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 2}])
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_RESERVATIONS=True)
+class AssignOrdersWithReservationsTest(AssignOrdersTest):
+    """
+    Тесты назначения заказов курьерам
+    с подтверждением резервов фонового планировщика
+    """
+
+    @staticmethod
+    def _plan():
+        """
+        Запуск планировщика
+        """
+        call_command('plan_deliveries', stdout=StringIO())
+
+    def test_confirm_reservation(self):
+        """
+        Назначение по резерву
+        """
+        Order.objects.create(id=1, weight=Decimal('2'), region=1)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        Order.objects.create(id=2, weight=Decimal('1'), region=4)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=2)
+        self._plan()
+        self.assertEqual(Reservation.objects.count(), 3)
+        self.assertEqual(Order.objects.get(id=1).reservation_id, 1)
+        self.assertEqual(Order.objects.get(id=2).reservation_id, 2)
+
+        # Заказ, появившийся после планирования, в резерв не попадает
+        Order.objects.create(id=3, weight=Decimal('1'), region=1)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=3)
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 1}])
+        self.assertFalse(Reservation.objects.filter(courier_id=1).exists())
+        self.assertIsNone(Order.objects.get(id=1).reservation_id)
+
+    def test_stale_reservation(self):
+        """
+        Назначение при устаревшем резерве
+        """
+        Order.objects.create(id=1, weight=Decimal('2'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        Order.objects.create(id=2, weight=Decimal('1'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=2)
+        self._plan()
+        self.assertEqual(Order.objects.get(id=1).reservation_id, 1)
+
+        Order.objects.filter(id=1).update(delivery=Delivery.objects.create(
+            courier_id=3, earnings_factor=9))
+        response = self._post_assign(1)
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 2}])
+
+    def test_update_courier_drops_reservation(self):
+        """
+        Изменение данных курьера удаляет его резерв
+        """
+        Order.objects.create(id=1, weight=Decimal('2'), region=1)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        self._plan()
+        self.assertTrue(Reservation.objects.filter(courier_id=1).exists())
+
+        self.client.patch('/couriers/1', json.dumps({'regions': [2]}), 'application/json')
+        self.assertFalse(Reservation.objects.filter(courier_id=1).exists())
+        self.assertEqual(json.loads(self._post_assign(1).content)['orders'], [])
+
+    def test_replan(self):
+        """
+        Повторное планирование заменяет резервы курьеров,
+        резерв курьера, получившего развоз, удаляется
+        """
+        Order.objects.create(id=1, weight=Decimal('2'), region=3)
+        Interval.objects.create(min_time='09:00', max_time='10:00', order_id=1)
+        self._plan()
+        self.assertEqual(Order.objects.get(id=1).reservation_id, 1)
+        self.assertEqual(
+            set(Reservation.objects.values_list('generation', flat=True)), {1})
+
+        Delivery.objects.create(courier_id=1, earnings_factor=2)
+        self._plan()
+        self.assertEqual(
+            sorted(Reservation.objects.values_list('courier_id', 'generation')),
+            [(2, 2), (3, 2)],
+        )
+        self.assertEqual(Order.objects.get(id=1).reservation_id, 2)
@@ -0,0 +1,45 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..models import *
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'BenchmarkAssignmentTest',
+]
+
+
+# =====================================================================================================================
+
+
+class BenchmarkAssignmentTest(TestCase):
+    """
+    Тесты сравнения стратегий назначения заказов
+    """
+
+    def test_benchmark(self):
+        """
+        Отчет по всем стратегиям, данные не сохраняются
+        """
+        output = StringIO()
+        call_command(
+            'benchmark_assignment', '--couriers', '5', '--orders', '50',
+            '--rounds', '2', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines[1:]],
+            ['greedy', 'knapsack', 'region_clustered', 'oldest_first']
+        )
+        self.assertEqual(Courier.objects.count(), 0)
+        self.assertEqual(Order.objects.count(), 0)
+
+    def test_unknown_strategy(self):
+        """
+        Неизвестная стратегия
+        """
+        with self.assertRaises(CommandError):
+            call_command('benchmark_assignment', 'unknown', stdout=StringIO())
@@ -0,0 +1,47 @@
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from ..models import *
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'BenchmarkValidationTest',
+]
+
+
+# =====================================================================================================================
+
+
+class BenchmarkValidationTest(TestCase):
+    """
+    Тесты сравнения способов проверки данных загрузки
+    """
+
+    def test_benchmark(self):
+        """
+        Отчет по обоим способам, результаты проверки совпадают
+        """
+        output = StringIO()
+        call_command(
+            'benchmark_validation', '--items', '200', '--invalid', '0.3',
+            '--rounds', '1', stdout=output)
+        lines = output.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[:2] for line in lines[1:]],
+            [['couriers', 'model'], ['couriers', 'schema'],
+             ['orders', 'model'], ['orders', 'schema']]
+        )
+        self.assertEqual(lines[1].split()[-1], lines[2].split()[-1])
+        self.assertNotEqual(lines[1].split()[-1], '0')
+        self.assertEqual(Courier.objects.count(), 0)
+
+    def test_unknown_kind(self):
+        """
+        Неизвестный тип объектов
+        """
+        with self.assertRaises(CommandError):
+            call_command('benchmark_validation', 'unknown', stdout=StringIO())
@@ -1,7 +1,10 @@
 import json
 from datetime import timedelta
-from django.test import TestCase
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 from ..models import *
+from ..handlers._courier_info_cache import CourierInfoCache
 
 
 # =====================================================================================================================
@@ -14,6 +17,7 @@ __all__ = [
 # =====================================================================================================================
 
 
+@override_settings(CANDY_DELIVERY_COURIER_INFO_CACHE='courier_info')
 class GetCourierInfoTest(TestCase):
     """
     Тест получения статистики курьера
@@ -34,6 +38,13 @@ class GetCourierInfoTest(TestCase):
         cls.courier.interval_set.create(min_time='12:00', max_time='13:00')
         cls.courier.interval_set.create(min_time='18:00', max_time='19:00')
 
+    def setUp(self):
+        """
+        Очистка тестового кэша ответов (откат транзакции
+        теста его не затрагивает)
+        """
+        caches[settings.CANDY_DELIVERY_COURIER_INFO_CACHE].clear()
+
     def __get_info(self, courier_id):
         """
         Отправка запроса на сревер
@@ -164,3 +175,180 @@ class GetCourierInfoTest(TestCase):
                 'earnings': 5500,  # 2*500 + 9*500
             }
         )
+
+    def test_stats_counted_once(self):
+        """
+        Тест на однократный учет развоза в статистике
+        """
+        delivery = GetCourierInfoTest.courier.delivery_set.create(
+            earnings_factor=2)
+        delivery.order_set.create(id=1, weight=Decimal('1'), region=1)
+        for _ in range(2):
+            self.__post_complete(
+                GetCourierInfoTest.courier.id, 1,
+                delivery.assign_time + timedelta(seconds=1800.)
+            )
+        Delivery.objects.get(id=delivery.id).complete()
+
+        stats = CourierStats.objects.get(courier=GetCourierInfoTest.courier)
+        self.assertEqual(stats.earnings_factor_sum, 2)
+        self.assertEqual(stats.region_durations, {'1': [1800., 1]})
+        self.assertEqual(stats.get_rating(), 2.5)
+
+    def test_stats_after_courier_update(self):
+        """
+        Тест на учет развоза, завершенного при изменении данных курьера
+        """
+        delivery = GetCourierInfoTest.courier.delivery_set.create(
+            earnings_factor=2)
+        delivery.order_set.create(id=1, weight=Decimal('1'), region=1)
+        delivery.order_set.create(id=2, weight=Decimal('1'), region=2)
+        self.__post_complete(
+            GetCourierInfoTest.courier.id, 1,
+            delivery.assign_time + timedelta(seconds=900.)
+        )
+        response = self.client.patch(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            json.dumps({'regions': [1]}), 'application/json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.__get_info(GetCourierInfoTest.courier.id)
+        content = json.loads(response.content)
+        self.assertEqual(content['earnings'], 1000)
+        self.assertEqual(content['rating'], 3.75)
+
+    def test_cache(self):
+        """
+        Тест на кэширование ответа и его сброс при изменении данных
+        """
+        response = self.__get_info(GetCourierInfoTest.courier.id)
+        with self.assertNumQueries(0):
+            cached_response = self.__get_info(GetCourierInfoTest.courier.id)
+        self.assertEqual(json.loads(cached_response.content), json.loads(response.content))
+
+        # Изменение данных курьера
+        response = self.client.patch(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            json.dumps({'regions': [4]}), 'application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(self.__get_info(GetCourierInfoTest.courier.id).content)['regions'], [4])
+
+        # Назначение и завершение заказа
+        Order.objects.create(id=1, weight=Decimal('1'), region=4).interval_set.create(
+            min_time='12:00', max_time='13:00')
+        response = self.client.post('/orders/assign', json.dumps({
+            'courier_id': GetCourierInfoTest.courier.id,
+        }), 'application/json')
+        self.assertEqual(json.loads(response.content)['orders'], [{'id': 1}])
+        self.__get_info(GetCourierInfoTest.courier.id)
+        delivery = Delivery.objects.get(courier=GetCourierInfoTest.courier)
+        self.__post_complete(
+            GetCourierInfoTest.courier.id, 1,
+            delivery.assign_time + timedelta(seconds=1800.)
+        )
+        content = json.loads(self.__get_info(GetCourierInfoTest.courier.id).content)
+        self.assertEqual(content['earnings'], delivery.earnings_factor * 500)
+        self.assertEqual(content['rating'], 2.5)
+
+    @override_settings(CANDY_DELIVERY_COURIER_INFO_CACHE=None)
+    def test_cache_disabled(self):
+        """
+        Тест с отключенным кэшированием
+        """
+        for _ in range(2):
+            with self.assertNumQueries(3):
+                self.__get_info(GetCourierInfoTest.courier.id)
+
+    def test_etag(self):
+        """
+        Тест на условный запрос с If-None-Match
+        """
+        response = self.__get_info(GetCourierInfoTest.courier.id)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+                HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # После изменения данных - полный ответ с новым ETag
+        self.client.patch(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            json.dumps({'courier_type': 'bike'}), 'application/json')
+        response = self.client.get(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['courier_type'], 'bike')
+
+    @override_settings(CANDY_DELIVERY_COURIER_INFO_CACHE=None)
+    def test_etag_without_cache(self):
+        """
+        Тест на условный запрос с отключенным кэшированием
+        (ETag по хэшу данных и статистике курьера)
+        """
+        # Курьер, записанный в обход обработчиков (без хэша данных) - без ETag
+        response = self.__get_info(GetCourierInfoTest.courier.id)
+        self.assertNotIn('ETag', response)
+
+        self.client.patch(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            json.dumps({'courier_type': 'bike'}), 'application/json')
+        etag = self.__get_info(GetCourierInfoTest.courier.id)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+                HTTP_IF_NONE_MATCH='"x", ' + etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        # После завершения развоза - полный ответ с новым ETag
+        delivery = GetCourierInfoTest.courier.delivery_set.create(earnings_factor=2)
+        delivery.order_set.create(id=1, weight=Decimal('1'), region=1)
+        self.__post_complete(
+            GetCourierInfoTest.courier.id, 1,
+            delivery.assign_time + timedelta(seconds=60.))
+        response = self.client.get(
+            '/couriers/{0}'.format(GetCourierInfoTest.courier.id),
+            HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(json.loads(response.content)['earnings'], 1000)
+
+    def test_unknown_courier_version(self):
+        """
+        Тест на отсутствие версии в кэше для несуществующего курьера
+        """
+        response = self.__get_info(100500)
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(CourierInfoCache.get_version(100500, create=False))
+
+        self.__get_info(GetCourierInfoTest.courier.id)
+        self.assertIsNotNone(CourierInfoCache.get_version(
+            GetCourierInfoTest.courier.id, create=False))
+
+    def test_constant_queries(self):
+        """
+        Тест на независимость числа запросов к БД от истории развозов
+        """
+        # Проверка существования курьера перед созданием версии в кэше,
+        # курьер, регионы и рабочие часы (статистика - в запросе курьера)
+        with self.assertNumQueries(4):
+            self.__get_info(GetCourierInfoTest.courier.id)
+
+        for i in range(1, 6):
+            delivery = GetCourierInfoTest.courier.delivery_set.create(
+                earnings_factor=2)
+            delivery.order_set.create(id=i, weight=Decimal('1'), region=i % 3 + 1)
+            self.__post_complete(
+                GetCourierInfoTest.courier.id, i,
+                delivery.assign_time + timedelta(seconds=60. * i)
+            )
+        with self.assertNumQueries(3):
+            response = self.__get_info(GetCourierInfoTest.courier.id)
+        self.assertEqual(json.loads(response.content)['earnings'], 5000)
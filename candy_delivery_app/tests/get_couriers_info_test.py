@@ -0,0 +1,116 @@
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from ..models import *
+
+
+# =====================================================================================================================
+
+__all__ = [
+    'GetCouriersInfoTest',
+]
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_COURIER_INFO_CACHE='courier_info')
+class GetCouriersInfoTest(TestCase):
+    """
+    Тест получения данных о нескольких курьерах
+    """
+
+    # Отключить ограничение на вывод
+    maxDiff = None
+
+    @classmethod
+    def setUpTestData(cls):
+        """
+        Инициализация тестовых данных
+        """
+        for i in range(1, 6):
+            courier = Courier.objects.create(id=i, type='bike')
+            courier.region_set.create(number=i)
+            courier.interval_set.create(min_time='12:00', max_time='13:00')
+
+        # Завершенный развоз курьера 2
+        courier = Courier.objects.get(id=2)
+        delivery = courier.delivery_set.create(earnings_factor=5)
+        order = delivery.order_set.create(
+            id=1, weight=Decimal('1'), region=2,
+            complete_time=delivery.assign_time + timedelta(seconds=1800.),
+            delivery_duration=1800.)
+        order.delivery.complete()
+
+    def setUp(self):
+        """
+        Очистка тестового кэша ответов (откат транзакции
+        теста его не затрагивает)
+        """
+        caches[settings.CANDY_DELIVERY_COURIER_INFO_CACHE].clear()
+
+    def test_post(self):
+        """
+        Запрос POST /couriers/info
+        """
+        with self.assertNumQueries(3):
+            response = self.client.post('/couriers/info', json.dumps({
+                'courier_ids': [2, 1, 5],
+            }), 'application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {
+            'couriers': [
+                {
+                    'courier_id': 2,
+                    'courier_type': 'bike',
+                    'regions': [2],
+                    'working_hours': ['12:00-13:00'],
+                    'earnings': 2500,
+                    'rating': 2.5,
+                },
+                {
+                    'courier_id': 1,
+                    'courier_type': 'bike',
+                    'regions': [1],
+                    'working_hours': ['12:00-13:00'],
+                    'earnings': 0,
+                },
+                {
+                    'courier_id': 5,
+                    'courier_type': 'bike',
+                    'regions': [5],
+                    'working_hours': ['12:00-13:00'],
+                    'earnings': 0,
+                },
+            ],
+        })
+
+    def test_get(self):
+        """
+        Запрос GET /couriers?ids=...
+        """
+        response = self.client.get('/couriers', {'ids': '1,2,3,4,5'})
+        self.assertEqual(response.status_code, 200)
+        couriers = json.loads(response.content)['couriers']
+        self.assertEqual([c['courier_id'] for c in couriers], [1, 2, 3, 4, 5])
+        for courier in couriers:
+            self.assertEqual(
+                courier,
+                json.loads(self.client.get('/couriers/{0}'.format(courier['courier_id'])).content)
+            )
+
+    def test_invalid_request(self):
+        """
+        Некорректные запросы
+        """
+        for data in ({}, {'courier_ids': 1}, {'courier_ids': [1, '2']},
+                     {'courier_ids': [1, 1]}, {'courier_ids': [1, 100500]}):
+            response = self.client.post('/couriers/info', json.dumps(data), 'application/json')
+            self.assertEqual(response.status_code, 400)
+        for ids in ('', '1,x', '1,,2'):
+            response = self.client.get('/couriers', {'ids': ids})
+            self.assertEqual(response.status_code, 400)
+        response = self.client.put('/couriers')
+        self.assertEqual(response.status_code, 405)
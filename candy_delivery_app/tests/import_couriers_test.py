@@ -1,5 +1,13 @@
-from django.test import TestCase
-from .. import models
+import json
+import multiprocessing
+from functools import partial
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+from django.db import connection
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
+from ..handlers import ImportCouriersHandler
+from .. import models, views
 
 
 # =====================================================================================================================
@@ -7,12 +15,67 @@ from .. import models
 
 __all__ = [
     'ImportCouriersTest',
+    'ImportCouriersFormatsTest',
+    'ImportCouriersStreamingTest',
+    'ImportCouriersParallelTest',
+    'ImportCouriersModelValidatorTest',
 ]
 
 
 # =====================================================================================================================
 
 
+class FailingImportCouriersHandler(ImportCouriersHandler):
+    """
+    Обработчик, прерывающий запись после заданного числа частей
+    """
+
+    # Максимальное число объектов
+    # в одном запросе к БД
+    _BATCH_SIZE = 2
+
+    def __init__(self, n_chunks, **kwargs):
+        """
+        Инициализация
+        :param int n_chunks: число частей, записываемых без ошибок
+        :param kwargs: параметры родительского класса
+        """
+        super().__init__(**kwargs)
+        self.__n_chunks = n_chunks
+
+    def _save_objects(self, objects):
+        """
+        Запись новых объектов в БД
+        :param list(ObjectWrapper) objects: объекты для записи
+        """
+        super()._save_objects(objects)
+        if self.__n_chunks == 0:
+            raise RuntimeError('Write failed')
+        self.__n_chunks -= 1
+
+
+# =====================================================================================================================
+
+
+class UncheckedImportCouriersHandler(ImportCouriersHandler):
+    """
+    Обработчик без предварительной проверки возможности перезаписи
+    (как если бы развоз был создан после проверки данных)
+    """
+
+    @staticmethod
+    def _filter_updatable(queryset):
+        """
+        Отбор объектов, которые можно перезаписать в режиме upsert
+        :param QuerySet queryset: запрос на выборку объектов
+        :return QuerySet: тот же запрос
+        """
+        return queryset
+
+
+# =====================================================================================================================
+
+
 class ImportCouriersTest(TestCase):
     """
     Тесты на регистрацию курьеров в системе
@@ -250,3 +313,304 @@ class ImportCouriersTest(TestCase):
             '   }'
             '}',
         )
+
+    def test_duplicate_id(self):
+        """
+        Тест на повтор id в одном запросе
+        """
+        data = \
+            '{' \
+            '   "data": [' \
+            '       {' \
+            '           "courier_id": 1, ' \
+            '           "courier_type": "foot", ' \
+            '           "regions": [1], ' \
+            '           "working_hours": ["09:00-11:00"]' \
+            '       },' \
+            '       {' \
+            '           "courier_id": 1, ' \
+            '           "courier_type": "car", ' \
+            '           "regions": [2], ' \
+            '           "working_hours": ["11:00-12:00"]' \
+            '       }' \
+            '   ]' \
+            '}'
+        response = self.client.post('/couriers', data, 'application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            '{"validation_error": {"couriers": [{"id": 1}]}}',
+        )
+        self.assertEqual(models.Courier.objects.count(), 0)
+
+    def test_upsert(self):
+        """
+        Повторная загрузка в режиме upsert
+        """
+        data = json.dumps({'data': [
+            {'courier_id': 1, 'courier_type': 'foot', 'regions': [1], 'working_hours': ['09:00-11:00']},
+            {'courier_id': 2, 'courier_type': 'car', 'regions': [2], 'working_hours': ['11:00-12:00']},
+        ]})
+        for _ in range(2):
+            response = self.client.post('/couriers?upsert=true', data, 'application/json')
+            self.assertEqual(response.status_code, 201)
+            self.assertJSONEqual(response.content, '{"couriers": [{"id": 1}, {"id": 2}]}')
+        self.assertEqual(models.Region.objects.count(), 2)
+
+        # Курьер с незавершенным развозом не может быть изменен
+        models.Delivery.objects.create(courier_id=2, earnings_factor=9)
+        data = json.dumps({'data': [
+            {'courier_id': 1, 'courier_type': 'bike', 'regions': [3, 4], 'working_hours': ['09:00-11:00']},
+            {'courier_id': 2, 'courier_type': 'foot', 'regions': [2], 'working_hours': ['11:00-12:00']},
+        ]})
+        response = self.client.post('/couriers?upsert=true', data, 'application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"couriers": [{"id": 2}]}}')
+
+        models.Delivery.objects.update(is_complete=True)
+        response = self.client.post('/couriers?upsert=true', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        courier = models.Courier.objects.get(id=1)
+        self.assertEqual(courier.type, 'bike')
+        self.assertEqual(
+            sorted(courier.region_set.values_list('number', flat=True)), [3, 4])
+        self.assertEqual(models.Courier.objects.get(id=2).type, 'foot')
+
+    def test_upsert_conflict(self):
+        """
+        Курьер, получивший развоз после проверки данных, не перезаписывается
+        """
+        data = json.dumps({'data': [
+            {'courier_id': 1, 'courier_type': 'foot', 'regions': [1], 'working_hours': ['09:00-11:00']},
+            {'courier_id': 2, 'courier_type': 'car', 'regions': [2], 'working_hours': ['11:00-12:00']},
+        ]})
+        response = self.client.post('/couriers?upsert=true', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        models.Delivery.objects.create(courier_id=2, earnings_factor=9)
+
+        request = RequestFactory().post('/couriers', json.dumps({'data': [
+            {'courier_id': 1, 'courier_type': 'bike', 'regions': [3], 'working_hours': ['09:00-11:00']},
+            {'courier_id': 2, 'courier_type': 'foot', 'regions': [4], 'working_hours': ['11:00-12:00']},
+        ]}), 'application/json')
+        response = UncheckedImportCouriersHandler(upsert=True).process(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"couriers": [{"id": 2}]}}')
+        self.assertEqual(models.Courier.objects.get(id=1).type, 'foot')
+        self.assertEqual(models.Courier.objects.get(id=2).type, 'car')
+        self.assertEqual(
+            sorted(models.Region.objects.values_list('number', flat=True)), [1, 2])
+
+    def test_constant_queries(self):
+        """
+        Тест на независимость числа запросов к БД от количества курьеров
+        """
+        for first_id, n_couriers in ((1, 1), (101, 50)):
+            data = json.dumps({
+                'data': [
+                    {
+                        'courier_id': i,
+                        'courier_type': 'bike',
+                        'regions': [1, 2],
+                        'working_hours': ['09:00-11:00', '12:00-18:00'],
+                    }
+                    for i in range(first_id, first_id + n_couriers)
+                ]
+            })
+            with CaptureQueriesContext(connection) as context:
+                response = self.client.post('/couriers', data, 'application/json')
+            self.assertEqual(response.status_code, 201)
+            # id + курьеры + районы + интервалы + начало/конец транзакции
+            self.assertLessEqual(len(context.captured_queries), 6)
+
+        self.assertEqual(models.Courier.objects.count(), 51)
+        self.assertEqual(models.Region.objects.count(), 102)
+        self.assertEqual(models.Interval.objects.count(), 102)
+
+    def _import_failing(self, n_couriers, n_chunks):
+        """
+        Импорт курьеров с ошибкой записи
+        :param int n_couriers: число курьеров в запросе
+        :param int n_chunks: число частей, записываемых без ошибок
+        """
+        data = json.dumps({
+            'data': [
+                {
+                    'courier_id': i,
+                    'courier_type': 'foot',
+                    'regions': [1],
+                    'working_hours': ['09:00-11:00'],
+                }
+                for i in range(1, n_couriers + 1)
+            ]
+        })
+        request = RequestFactory().post('/couriers', data, 'application/json')
+        response = FailingImportCouriersHandler(n_chunks).process(request)
+        self.assertEqual(response.status_code, 500)
+
+    def test_failed_write(self):
+        """
+        Тест на откат всего запроса при ошибке записи
+        """
+        self._import_failing(5, 0)
+        self.assertEqual(models.Courier.objects.count(), 0)
+        self.assertEqual(models.Region.objects.count(), 0)
+
+    @override_settings(CANDY_DELIVERY_IMPORT_COMMIT_SIZE=2)
+    def test_chunked_commits(self):
+        """
+        Тест на запись частями: при ошибке сохраняются
+        только части, зафиксированные до нее
+        """
+        self._import_failing(5, 1)
+        self.assertEqual(
+            sorted(models.Courier.objects.values_list('id', flat=True)),
+            [1, 2],
+        )
+        self.assertEqual(models.Region.objects.count(), 2)
+
+
+# =====================================================================================================================
+
+
+class ImportCouriersFormatsTest(TestCase):
+    """
+    Тесты на регистрацию курьеров в форматах NDJSON и CSV
+    """
+
+    # Отключить ограничение на вывод
+    maxDiff = None
+
+    def test_ndjson_request(self):
+        """
+        Запрос в формате NDJSON
+        """
+        data = \
+            '{"courier_id": 1, "courier_type": "foot", "regions": [1, 12], "working_hours": ["09:00-11:00"]}\n' \
+            '{"courier_id": 2, "courier_type": "plane", "regions": [1], "working_hours": []}\n'
+        response = self.client.post('/couriers/ndjson', data, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"couriers": [{"id": 2}]}}')
+        self.assertEqual(models.Courier.objects.count(), 0)
+
+        data = data.replace('plane', 'car')
+        response = self.client.post('/couriers/ndjson', data, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"couriers": [{"id": 1}, {"id": 2}]}')
+        self.assertEqual(
+            sorted(models.Courier.objects.get(id=1).region_set.values_list('number', flat=True)),
+            [1, 12],
+        )
+
+    def test_csv_request(self):
+        """
+        Запрос в формате CSV
+        """
+        data = \
+            'courier_id,courier_type,regions,working_hours\r\n' \
+            '1,foot,1;12;22,11:35-14:05;09:00-11:00\r\n' \
+            '2,car,22,\r\n' \
+            '3,bike,22;x,09:00-18:00\r\n' \
+            '4,bike,22,09:00-18:00,extra\r\n'
+        response = self.client.post('/couriers/csv', data, 'text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            '{"validation_error": {"couriers": [{"id": 3}, {"id": 4}]}}',
+        )
+        self.assertEqual(models.Courier.objects.count(), 0)
+
+        data = '\r\n'.join(data.split('\r\n')[:3]) + '\r\n'
+        response = self.client.post('/couriers/csv', data, 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"couriers": [{"id": 1}, {"id": 2}]}')
+        courier = models.Courier.objects.get(id=1)
+        self.assertEqual(courier.type, 'foot')
+        self.assertEqual(courier.interval_set.count(), 2)
+        self.assertEqual(models.Courier.objects.get(id=2).interval_set.count(), 0)
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_STREAMING_IMPORT_THRESHOLD=0)
+class ImportCouriersStreamingTest(ImportCouriersTest):
+    """
+    Тесты на регистрацию курьеров при потоковом разборе запроса
+    """
+
+    def test_invalid_data_rollback(self):
+        """
+        Тест на откат всего запроса при ошибке в данных
+        """
+        request = RequestFactory().post('/couriers', json.dumps({'data': [
+            {'courier_id': i, 'courier_type': 'foot' if i < 5 else 'plane',
+             'regions': [1], 'working_hours': ['09:00-11:00']}
+            for i in range(1, 6)
+        ]}), 'application/json')
+        response = FailingImportCouriersHandler(100).process(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(models.Courier.objects.count(), 0)
+
+    @override_settings(CANDY_DELIVERY_IMPORT_COMMIT_SIZE=2)
+    def test_chunked_commits_invalid_data(self):
+        """
+        Тест на запись частями при потоковом разборе: при ошибке в данных
+        сохраняются части, зафиксированные до нее
+        """
+        request = RequestFactory().post('/couriers', json.dumps({'data': [
+            {'courier_id': i, 'courier_type': 'foot' if i < 5 else 'plane',
+             'regions': [1], 'working_hours': ['09:00-11:00']}
+            for i in range(1, 6)
+        ]}), 'application/json')
+        response = FailingImportCouriersHandler(100).process(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"couriers": [{"id": 5}]}}')
+        self.assertEqual(
+            sorted(models.Courier.objects.values_list('id', flat=True)),
+            [1, 2, 3, 4],
+        )
+
+
+# =====================================================================================================================
+
+
+@override_settings(
+    CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD=2,
+    CANDY_DELIVERY_VALIDATION_PROCESSES=2,
+)
+class ImportCouriersParallelTest(ImportCouriersTest):
+    """
+    Тесты на регистрацию курьеров при проверке данных в нескольких процессах
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Запуск пула процессов, передаваемого обработчику
+        (как это делает команда process_imports)
+        """
+        super().setUpClass()
+        cls.executor = ProcessPoolExecutor(
+            2, mp_context=multiprocessing.get_context('fork'))
+        cls.handler_patch = mock.patch.object(
+            views, 'ImportCouriersHandler', partial(ImportCouriersHandler, executor=cls.executor))
+        cls.handler_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Завершение пула процессов
+        """
+        cls.handler_patch.stop()
+        cls.executor.shutdown()
+        super().tearDownClass()
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_IMPORT_VALIDATOR='model')
+class ImportCouriersModelValidatorTest(ImportCouriersTest):
+    """
+    Тесты на регистрацию курьеров при проверке данных методами full_clean моделей
+    """
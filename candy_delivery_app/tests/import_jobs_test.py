@@ -0,0 +1,209 @@
+import json
+from io import StringIO
+from datetime import timedelta
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from django.utils import timezone
+from django.test import TestCase
+from django.core.management import call_command
+from ..import_jobs import ImportJobRunner
+from .. import models
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'ImportJobsTest',
+]
+
+
+# =====================================================================================================================
+
+
+class ImportJobsTest(TestCase):
+    """
+    Тесты на асинхронную загрузку
+    """
+
+    # Отключить ограничение на вывод
+    maxDiff = None
+
+    def _get_job(self, import_id):
+        """
+        Запрос состояния задания
+        :param int import_id: id задания
+        :return dict: состояние задания
+        """
+        response = self.client.get('/imports/{0}'.format(import_id))
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_couriers(self):
+        """
+        Загрузка курьеров
+        """
+        data = json.dumps({
+            'data': [
+                {
+                    'courier_id': i,
+                    'courier_type': 'foot',
+                    'regions': [1],
+                    'working_hours': ['09:00-11:00'],
+                }
+                for i in (1, 2, 3)
+            ]
+        })
+        response = self.client.post('/couriers?async=1', data, 'application/json')
+        self.assertEqual(response.status_code, 202)
+        import_id = json.loads(response.content)['import_id']
+        self.assertEqual(models.Courier.objects.count(), 0)
+        self.assertEqual(
+            self._get_job(import_id),
+            {'import_id': import_id, 'kind': 'couriers', 'status': 'queued', 'processed_items': 0},
+        )
+
+        out = StringIO()
+        call_command('process_imports', stdout=out)
+        self.assertIn('Processed imports: 1', out.getvalue())
+        self.assertEqual(
+            self._get_job(import_id),
+            {
+                'import_id': import_id,
+                'kind': 'couriers',
+                'status': 'done',
+                'processed_items': 3,
+                'result_status': 201,
+                'result': {'couriers': [{'id': 1}, {'id': 2}, {'id': 3}]},
+            },
+        )
+        self.assertEqual(models.Courier.objects.count(), 3)
+        self.assertEqual(models.ImportJob.objects.get(id=import_id).payload, b'')
+
+    def test_orders_validation_error(self):
+        """
+        Загрузка заказов (CSV) с ошибкой в данных
+        """
+        data = \
+            'order_id,weight,region,delivery_hours\r\n' \
+            '1,0.23,12,09:00-18:00\r\n' \
+            '2,100,12,09:00-18:00\r\n'
+        response = self.client.post('/orders/csv?async=1', data, 'text/csv')
+        self.assertEqual(response.status_code, 202)
+        import_id = json.loads(response.content)['import_id']
+
+        call_command('process_imports', stdout=StringIO())
+        job = self._get_job(import_id)
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['processed_items'], 2)
+        self.assertEqual(job['result_status'], 400)
+        self.assertEqual(job['result'], {'validation_error': {'orders': [{'id': 2}]}})
+        self.assertEqual(models.Order.objects.count(), 0)
+
+    def test_upsert(self):
+        """
+        Повторная загрузка заказов в режиме upsert
+        """
+        data = \
+            'order_id,weight,region,delivery_hours\r\n' \
+            '1,0.23,12,09:00-18:00\r\n'
+        for _ in range(2):
+            response = self.client.post('/orders/csv?async=1&upsert=1', data, 'text/csv')
+            self.assertEqual(response.status_code, 202)
+            import_id = json.loads(response.content)['import_id']
+            call_command('process_imports', stdout=StringIO())
+            job = self._get_job(import_id)
+            self.assertEqual(job['result_status'], 201)
+            self.assertEqual(job['result'], {'orders': [{'id': 1}]})
+        self.assertEqual(models.Order.objects.count(), 1)
+
+    def test_failed_job(self):
+        """
+        Задание с некорректным документом
+        """
+        response = self.client.post('/orders?async=1', '{"data": [', 'application/json')
+        import_id = json.loads(response.content)['import_id']
+        call_command('process_imports', stdout=StringIO())
+        job = self._get_job(import_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['result_status'], 500)
+
+    def test_parallel_validation(self):
+        """
+        Проверка данных большого задания в пуле процессов
+        (при настройках по умолчанию и нескольких ядрах)
+        """
+        n_orders = settings.CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD
+        data = 'order_id,weight,region,delivery_hours\r\n' + ''.join(
+            '{0},0.23,12,09:00-18:00\r\n'.format(i)
+            for i in range(1, n_orders + 1)
+        )
+        response = self.client.post('/orders/csv?async=1', data, 'text/csv')
+        import_id = json.loads(response.content)['import_id']
+
+        with mock.patch('os.cpu_count', return_value=2), mock.patch.object(
+                ProcessPoolExecutor, 'map', autospec=True,
+                side_effect=ProcessPoolExecutor.map) as executor_map:
+            call_command('process_imports', stdout=StringIO())
+        self.assertEqual(executor_map.call_count, 1)
+        job = self._get_job(import_id)
+        self.assertEqual(job['result_status'], 201)
+        self.assertEqual(job['processed_items'], n_orders)
+        self.assertEqual(models.Order.objects.count(), n_orders)
+
+    def test_stale_job(self):
+        """
+        Задание, обработка которого прервалась
+        """
+        now = timezone.now()
+        stale_job = models.ImportJob.objects.create(
+            kind=models.ImportJob.AllowedKinds.ORDERS,
+            content_format=models.ImportJob.AllowedFormats.JSON,
+            payload=b'{"data": []}',
+            status=models.ImportJob.AllowedStatuses.RUNNING,
+            started_time=now - timedelta(hours=3),
+            heartbeat_time=now - timedelta(hours=2),
+        )
+        running_job = models.ImportJob.objects.create(
+            kind=models.ImportJob.AllowedKinds.ORDERS,
+            content_format=models.ImportJob.AllowedFormats.JSON,
+            payload=b'{"data": []}',
+            status=models.ImportJob.AllowedStatuses.RUNNING,
+            started_time=now - timedelta(hours=3),
+            heartbeat_time=now,
+        )
+        out = StringIO()
+        call_command('process_imports', stdout=out)
+        self.assertIn('Failed stale imports: 1', out.getvalue())
+        job = self._get_job(stale_job.id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['result_status'], 500)
+        self.assertEqual(self._get_job(running_job.id)['status'], 'running')
+
+    def test_lost_claim(self):
+        """
+        Задание, завершенное с ошибкой другим процессом во время обработки
+        """
+        data = \
+            'order_id,weight,region,delivery_hours\r\n' \
+            '1,0.23,12,09:00-18:00\r\n'
+        response = self.client.post('/orders/csv?async=1', data, 'text/csv')
+        import_id = json.loads(response.content)['import_id']
+        models.ImportJob.objects.filter(id=import_id).update(
+            status=models.ImportJob.AllowedStatuses.FAILED, result_status=500)
+
+        job = models.ImportJob.objects.get(id=import_id)
+        with mock.patch('sys.stderr', new=StringIO()) as stderr:
+            self.assertFalse(ImportJobRunner().run(job))
+        self.assertIn('Import job {0}'.format(import_id), stderr.getvalue())
+        job = self._get_job(import_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertEqual(job['result_status'], 500)
+
+    def test_unknown_job(self):
+        """
+        Запрос состояния несуществующего задания
+        """
+        response = self.client.get('/imports/100500')
+        self.assertEqual(response.status_code, 404)
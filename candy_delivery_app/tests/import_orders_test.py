@@ -1,6 +1,11 @@
+import multiprocessing
 from decimal import Decimal
-from django.test import TestCase
-from .. import models
+from functools import partial
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+from django.test import TestCase, RequestFactory, override_settings
+from ..handlers import ImportOrdersHandler
+from .. import models, views
 
 
 # =====================================================================================================================
@@ -8,12 +13,35 @@ from .. import models
 
 __all__ = [
     'ImportOrdersTest',
+    'ImportOrdersFormatsTest',
+    'ImportOrdersStreamingTest',
+    'ImportOrdersParallelTest',
+    'ImportOrdersModelValidatorTest',
 ]
 
 
 # =====================================================================================================================
 
 
+class UncheckedImportOrdersHandler(ImportOrdersHandler):
+    """
+    Обработчик без предварительной проверки возможности перезаписи
+    (как если бы заказ был назначен после проверки данных)
+    """
+
+    @staticmethod
+    def _filter_updatable(queryset):
+        """
+        Отбор объектов, которые можно перезаписать в режиме upsert
+        :param QuerySet queryset: запрос на выборку объектов
+        :return QuerySet: тот же запрос
+        """
+        return queryset
+
+
+# =====================================================================================================================
+
+
 class ImportOrdersTest(TestCase):
     """
     Тесты на регистрацию заказов в системе
@@ -301,3 +329,218 @@ class ImportOrdersTest(TestCase):
             '   }'
             '}',
         )
+
+    def test_upsert(self):
+        """
+        Повторная загрузка в режиме upsert
+        """
+        data = \
+            '{"data": [' \
+            '   {"order_id": 1, "weight": 0.23, "region": 12, "delivery_hours": ["09:00-18:00"]},' \
+            '   {"order_id": 2, "weight": 15, "region": 1, "delivery_hours": ["09:00-12:00"]}' \
+            ']}'
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        interval_ids = set(models.Interval.objects.values_list('id', flat=True))
+
+        # Повтор того же запроса - данные не перезаписываются
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"orders": [{"id": 1}, {"id": 2}]}')
+        self.assertEqual(
+            set(models.Interval.objects.values_list('id', flat=True)), interval_ids)
+
+        # Без режима upsert повторный id - ошибка
+        response = self.client.post('/orders', data, 'application/json')
+        self.assertEqual(response.status_code, 400)
+
+        # Измененный свободный заказ перезаписывается
+        data = \
+            '{"data": [' \
+            '   {"order_id": 1, "weight": 0.5, "region": 3, "delivery_hours": ["10:00-11:00", "12:00-13:00"]},' \
+            '   {"order_id": 3, "weight": 1, "region": 1, "delivery_hours": ["09:00-12:00"]}' \
+            ']}'
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"orders": [{"id": 1}, {"id": 3}]}')
+        order = models.Order.objects.get(id=1)
+        self.assertEqual(order.weight, Decimal('0.5'))
+        self.assertEqual(order.region, 3)
+        self.assertEqual(
+            [str(i) for i in order.interval_set.order_by('min_time')],
+            ['10:00-11:00', '12:00-13:00'],
+        )
+        self.assertEqual(models.Order.objects.count(), 3)
+
+        # Назначенный заказ можно загрузить повторно, но не изменить
+        courier = models.Courier.objects.create(id=1, type='foot')
+        models.Order.objects.filter(id=2).update(
+            delivery=models.Delivery.objects.create(courier=courier, earnings_factor=2))
+        data = \
+            '{"data": [' \
+            '   {"order_id": 2, "weight": 15, "region": 1, "delivery_hours": ["09:00-12:00"]}' \
+            ']}'
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        data = \
+            '{"data": [' \
+            '   {"order_id": 2, "weight": 10, "region": 1, "delivery_hours": ["09:00-12:00"]}' \
+            ']}'
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"orders": [{"id": 2}]}}')
+        self.assertEqual(models.Order.objects.get(id=2).weight, Decimal('15'))
+
+    def test_upsert_conflict(self):
+        """
+        Заказ, назначенный после проверки данных, не перезаписывается
+        """
+        data = \
+            '{"data": [' \
+            '   {"order_id": 1, "weight": 0.23, "region": 12, "delivery_hours": ["09:00-18:00"]},' \
+            '   {"order_id": 2, "weight": 15, "region": 1, "delivery_hours": ["09:00-12:00"]}' \
+            ']}'
+        response = self.client.post('/orders?upsert=1', data, 'application/json')
+        self.assertEqual(response.status_code, 201)
+        courier = models.Courier.objects.create(id=1, type='foot')
+        models.Order.objects.filter(id=2).update(
+            delivery=models.Delivery.objects.create(courier=courier, earnings_factor=2))
+
+        data = \
+            '{"data": [' \
+            '   {"order_id": 1, "weight": 0.5, "region": 12, "delivery_hours": ["09:00-18:00"]},' \
+            '   {"order_id": 2, "weight": 10, "region": 1, "delivery_hours": ["10:00-11:00"]}' \
+            ']}'
+        request = RequestFactory().post('/orders', data, 'application/json')
+        response = UncheckedImportOrdersHandler(upsert=True).process(request)
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(response.content, '{"validation_error": {"orders": [{"id": 2}]}}')
+        self.assertEqual(models.Order.objects.get(id=1).weight, Decimal('0.23'))
+        self.assertEqual(models.Order.objects.get(id=2).weight, Decimal('15'))
+        self.assertEqual(
+            [str(i) for i in models.Interval.objects.filter(order_id=2)], ['09:00-12:00'])
+
+
+# =====================================================================================================================
+
+
+class ImportOrdersFormatsTest(TestCase):
+    """
+    Тесты на регистрацию заказов в форматах NDJSON и CSV
+    """
+
+    # Отключить ограничение на вывод
+    maxDiff = None
+
+    def test_ndjson_request(self):
+        """
+        Запрос в формате NDJSON
+        """
+        data = \
+            '{"order_id": 1, "weight": 0.23, "region": 12, "delivery_hours": ["09:00-18:00"]}\n' \
+            '\n' \
+            '{"order_id": 2, "weight": 15, "region": 1, "delivery_hours": ["09:00-12:00", "16:00-21:30"]}\n'
+        response = self.client.post('/orders/ndjson', data, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"orders": [{"id": 1}, {"id": 2}]}')
+        self.assertEqual(models.Order.objects.get(id=2).weight, Decimal('15'))
+        self.assertEqual(
+            [str(i) for i in models.Order.objects.get(id=2).interval_set.order_by('min_time')],
+            ['09:00-12:00', '16:00-21:30'],
+        )
+
+        data = \
+            '{"order_id": 3, "weight": 0.23, "region": 12, "delivery_hours": ["09:00-18:00"]}\n' \
+            '{"order_id": 1, "weight": 0.23, "region": 12, "delivery_hours": ["09:00-18:00"]}\n' \
+            '{"order_id": 4, "weight": 0.23, "region": 12}\n'
+        response = self.client.post('/orders/ndjson', data, 'application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            '{"validation_error": {"orders": [{"id": 1}, {"id": 4}]}}',
+        )
+        self.assertFalse(models.Order.objects.filter(id=3).exists())
+
+    def test_csv_request(self):
+        """
+        Запрос в формате CSV
+        """
+        data = \
+            'order_id,weight,region,delivery_hours\r\n' \
+            '1,0.23,12,09:00-18:00\r\n' \
+            '2,15,1,09:00-12:00;16:00-21:30\r\n'
+        response = self.client.post('/orders/csv', data, 'text/csv')
+        self.assertEqual(response.status_code, 201)
+        self.assertJSONEqual(response.content, '{"orders": [{"id": 1}, {"id": 2}]}')
+        self.assertEqual(models.Order.objects.get(id=1).weight, Decimal('0.23'))
+        self.assertEqual(models.Order.objects.get(id=2).region, 1)
+        self.assertEqual(models.Order.objects.get(id=2).interval_set.count(), 2)
+
+        data = \
+            'order_id,weight,region,delivery_hours\r\n' \
+            '3,abc,12,09:00-18:00\r\n' \
+            'x,0.23,12,09:00-18:00\r\n' \
+            '4,0.23,12,\r\n' \
+            '5,0.23,12,09:00-18:00\r\n'
+        response = self.client.post('/orders/csv', data, 'text/csv')
+        self.assertEqual(response.status_code, 400)
+        self.assertJSONEqual(
+            response.content,
+            '{"validation_error": {"orders": [{"id": 3}, {"id": "x"}, {"id": 4}]}}',
+        )
+        self.assertEqual(models.Order.objects.count(), 2)
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_STREAMING_IMPORT_THRESHOLD=0)
+class ImportOrdersStreamingTest(ImportOrdersTest):
+    """
+    Тесты на регистрацию заказов при потоковом разборе запроса
+    """
+
+
+# =====================================================================================================================
+
+
+@override_settings(
+    CANDY_DELIVERY_PARALLEL_VALIDATION_THRESHOLD=2,
+    CANDY_DELIVERY_VALIDATION_PROCESSES=2,
+)
+class ImportOrdersParallelTest(ImportOrdersTest):
+    """
+    Тесты на регистрацию заказов при проверке данных в нескольких процессах
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        Запуск пула процессов, передаваемого обработчику
+        (как это делает команда process_imports)
+        """
+        super().setUpClass()
+        cls.executor = ProcessPoolExecutor(
+            2, mp_context=multiprocessing.get_context('fork'))
+        cls.handler_patch = mock.patch.object(
+            views, 'ImportOrdersHandler', partial(ImportOrdersHandler, executor=cls.executor))
+        cls.handler_patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        Завершение пула процессов
+        """
+        cls.handler_patch.stop()
+        cls.executor.shutdown()
+        super().tearDownClass()
+
+
+# =====================================================================================================================
+
+
+@override_settings(CANDY_DELIVERY_IMPORT_VALIDATOR='model')
+class ImportOrdersModelValidatorTest(ImportOrdersTest):
+    """
+    Тесты на регистрацию заказов при проверке данных методами full_clean моделей
+    """
@@ -0,0 +1,43 @@
+from datetime import time
+from django.test import SimpleTestCase
+from ..models import Interval
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'IntervalTest',
+]
+
+
+# =====================================================================================================================
+
+
+class IntervalTest(SimpleTestCase):
+    """
+    Тесты на разбор строкового представления интервалов
+    """
+
+    def test_parse_bounds(self):
+        """
+        Разбор корректных и некорректных строк
+        """
+        bounds, error = Interval.parse_bounds('09:00-18:30')
+        self.assertIsNone(error)
+        self.assertEqual(bounds, (time(9, 0), time(18, 30)))
+        # Повторный разбор возвращает тот же (неизменяемый) объект
+        self.assertIs(Interval.parse_bounds('09:00-18:30')[0], bounds)
+
+        for string in ('09:00-18:00:35', '9:00-18:00', '00:73-09:00', '18:00-36:15', 12, None):
+            bounds, error = Interval.parse_bounds(string)
+            self.assertIsNone(bounds)
+            self.assertIsNotNone(error)
+
+    def test_from_string_list(self):
+        """
+        Интервалы из списка строк
+        """
+        intervals = Interval.from_string_list(['09:00-11:00', '09:00-11:00'])
+        self.assertEqual([str(i) for i in intervals], ['09:00-11:00', '09:00-11:00'])
+        self.assertIsNot(intervals[0], intervals[1])
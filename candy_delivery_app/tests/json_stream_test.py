@@ -0,0 +1,60 @@
+from io import BytesIO
+from django.test import SimpleTestCase
+from ..handlers._json_stream import iterate_json_array
+
+
+# =====================================================================================================================
+
+
+__all__ = [
+    'JsonStreamTest',
+]
+
+
+# =====================================================================================================================
+
+
+class JsonStreamTest(SimpleTestCase):
+    """
+    Тесты на потоковый разбор JSON
+    """
+
+    def _parse(self, document, chunk_size=3):
+        """
+        Разбор документа
+        :param str document: документ
+        :param int chunk_size: размер блока чтения в байтах
+        :return list: элементы массива 'data'
+        """
+        return list(iterate_json_array(
+            BytesIO(document.encode('utf-8')), 'data', chunk_size))
+
+    def test_items(self):
+        """
+        Разбор элементов при любой границе блоков чтения
+        """
+        document = \
+            ' { "info": {"data": [0]}, "data" : [ {"id": 1, "name": "Сладости"},' \
+            ' 12345, -1.5e3, "a,b]", null, true, [1, [2]] ], "tail": 7 } '
+        expected = [
+            {'id': 1, 'name': 'Сладости'}, 12345, -1.5e3, 'a,b]', None, True, [1, [2]],
+        ]
+        for chunk_size in (1, 2, 3, 7, 4096):
+            self.assertEqual(self._parse(document, chunk_size), expected)
+
+    def test_empty(self):
+        """
+        Пустой массив
+        """
+        self.assertEqual(self._parse('{"data": []}'), [])
+
+    def test_invalid_documents(self):
+        """
+        Некорректные документы
+        """
+        for document in ('', '[]', '{"data": [1, 2}', '{"data": [1 2]}',
+                         '{"data": [1]} {}', '{"data": [{"id": 1}'):
+            with self.assertRaises(ValueError):
+                self._parse(document)
+        with self.assertRaises(KeyError):
+            self._parse('{"items": [1]}')
@@ -6,9 +6,16 @@ from . import views
 
 
 urlpatterns = [
-    path('couriers', views.post_couriers, name='post_couriers'),
+    path('couriers', views.get_post_couriers, name='get_post_couriers'),
+    path('couriers/info', views.post_couriers_info, name='post_couriers_info'),
+    path('couriers/ndjson', views.post_couriers_ndjson, name='post_couriers_ndjson'),
+    path('couriers/csv', views.post_couriers_csv, name='post_couriers_csv'),
     re_path('couriers/[0-9]+', views.get_patch_courier, name='get_patch_courier'),
     path('orders', views.post_orders, name='post_orders'),
+    path('orders/ndjson', views.post_orders_ndjson, name='post_orders_ndjson'),
+    path('orders/csv', views.post_orders_csv, name='post_orders_csv'),
     path('orders/assign', views.post_orders_assign, name='post_orders_assign'),
+    path('orders/assign/batch', views.post_orders_assign_batch, name='post_orders_assign_batch'),
     path('orders/complete', views.post_orders_complete, name='post_orders_complete'),
+    re_path('imports/[0-9]+', views.get_import, name='get_import'),
 ]
@@ -1,17 +1,61 @@
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_GET
 from .handlers import *
+from .models import ImportJob
 
 
 # =====================================================================================================================
 
 
+def _import(request, kind, handler_type, content_format='json'):
+    """
+    Загрузка объектов: сразу или, если задан параметр
+    async=1, через задание в очереди (ответ 202 с id задания);
+    параметр upsert=1 включает режим повторной загрузки
+    """
+    upsert = request.GET.get('upsert', '').lower() in ('1', 'true')
+    if request.GET.get('async', '').lower() in ('1', 'true'):
+        return EnqueueImportHandler(kind, content_format, upsert=upsert).process(request)
+    return handler_type(content_format, upsert=upsert).process(request)
+
+
+def get_post_couriers(request):
+    """
+    Загрузка списка курьеров в систему/выдача
+    информации о нескольких курьерах (GET ?ids=1,2,3)
+    """
+    if request.method == 'POST':
+        return _import(request, ImportJob.AllowedKinds.COURIERS, ImportCouriersHandler)
+    elif request.method == 'GET':
+        return GetCouriersInfoHandler().process(request)
+    else:
+        return JsonResponse(
+            {'error': 'Allowed methods are: POST, GET'}, status=405
+        )
+
+
+@require_POST
+def post_couriers_info(request):
+    """
+    Выдача информации о нескольких курьерах
+    """
+    return GetCouriersInfoHandler().process(request)
+
+
 @require_POST
-def post_couriers(request):
+def post_couriers_ndjson(request):
     """
-    Загрузка списка курьеров в систему
+    Загрузка списка курьеров в систему (NDJSON)
     """
-    return ImportCouriersHandler().process(request)
+    return _import(request, ImportJob.AllowedKinds.COURIERS, ImportCouriersHandler, 'ndjson')
+
+
+@require_POST
+def post_couriers_csv(request):
+    """
+    Загрузка списка курьеров в систему (CSV)
+    """
+    return _import(request, ImportJob.AllowedKinds.COURIERS, ImportCouriersHandler, 'csv')
 
 
 def get_patch_courier(request):
@@ -33,7 +77,23 @@ def post_orders(request):
     """
     Загрузка списка заказов в систему
     """
-    return ImportOrdersHandler().process(request)
+    return _import(request, ImportJob.AllowedKinds.ORDERS, ImportOrdersHandler)
+
+
+@require_POST
+def post_orders_ndjson(request):
+    """
+    Загрузка списка заказов в систему (NDJSON)
+    """
+    return _import(request, ImportJob.AllowedKinds.ORDERS, ImportOrdersHandler, 'ndjson')
+
+
+@require_POST
+def post_orders_csv(request):
+    """
+    Загрузка списка заказов в систему (CSV)
+    """
+    return _import(request, ImportJob.AllowedKinds.ORDERS, ImportOrdersHandler, 'csv')
 
 
 @require_POST
@@ -44,9 +104,25 @@ def post_orders_assign(request):
     return AssignOrdersHandler().process(request)
 
 
+@require_POST
+def post_orders_assign_batch(request):
+    """
+    Назначение заказов нескольким курьерам
+    """
+    return AssignOrdersBatchHandler().process(request)
+
+
 @require_POST
 def post_orders_complete(request):
     """
     Регистрация выполнения заказа
     """
     return CompleteOrderHandler().process(request)
+
+
+@require_GET
+def get_import(request):
+    """
+    Выдача состояния задания на асинхронную загрузку
+    """
+    return GetImportJobHandler().process(request)
@@ -1,4 +1,7 @@
 import abc
+import json
+import hashlib
+from django.db import connection
 from django.db.models import Model
 
 
@@ -21,6 +24,14 @@ class ObjectWrapper(abc.ABC):
     # Тип модели объекта
     MODEL_TYPE = Model
 
+    # Имена связанных наборов объектов,
+    # загружаемых вместе с объектом
+    RELATED_SETS = tuple()
+
+    # Имена полей объекта, перезаписываемых
+    # при повторной загрузке (upsert)
+    CONTENT_FIELDS = tuple()
+
     def __init__(self, object_, select_related=False):
         """
         Инициализация
@@ -36,18 +47,40 @@ class ObjectWrapper(abc.ABC):
             self.select_related_objects()
 
     @classmethod
-    def select(cls, object_id, select_related=True):
+    def select(cls, object_id, select_related=True, *, for_update=False,
+               queryset=None):
         """
         Загрузка данных из БД
         :param int object_id: id объекта
         :param bool select_related: флаг загрузки связанных объектов
+        :param bool for_update: флаг блокировки строки объекта
+            до конца текущей транзакции (SELECT ... FOR UPDATE)
+        :param QuerySet | None queryset: запрос на выборку объектов
+            типа MODEL_TYPE (например, с select_related)
         :return ObjectWrapper: объект ObjectWrapper
         """
-        wrapper = cls(cls.MODEL_TYPE.objects.get(id=object_id))
+        if queryset is None:
+            queryset = cls.MODEL_TYPE.objects.all()
+        if for_update:
+            queryset = queryset.select_for_update()
+        wrapper = cls(queryset.get(id=object_id))
         if select_related:
             wrapper.select_related_objects()
         return wrapper
 
+    @classmethod
+    def select_list(cls, queryset):
+        """
+        Загрузка списка объектов из БД вместе со связанными объектами
+        (число запросов к БД не зависит от количества объектов)
+        :param QuerySet queryset: запрос на выборку объектов типа MODEL_TYPE
+        :return list(ObjectWrapper): список объектов ObjectWrapper
+        """
+        return [
+            cls(object_, True) for object_ in
+            queryset.prefetch_related(*cls.RELATED_SETS)
+        ]
+
     @abc.abstractmethod
     def select_related_objects(self):
         """
@@ -62,11 +95,13 @@ class ObjectWrapper(abc.ABC):
         self.object_.refresh_from_db()
         self.select_related_objects()
 
-    def clean(self):
+    def clean(self, validate_unique=True):
         """
         Валидация данных
+        :param bool validate_unique: флаг проверки уникальности в БД
+            (при пакетной загрузке проверяется сразу для всех объектов)
         """
-        self.object_.full_clean()
+        self.object_.full_clean(validate_unique=validate_unique)
         self.clean_related_objects()
 
     @abc.abstractmethod
@@ -81,9 +116,135 @@ class ObjectWrapper(abc.ABC):
         Запись данных в БД
         :param bool force_update: флаг принудительной перезаписи данных
         """
+        self.object_.content_hash = self.content_hash()
         self.object_.save()
         self.save_related_objects(force_update)
 
+    def content_hash(self):
+        """
+        Вычисление хэша данных объекта (для пропуска
+        неизмененных объектов при повторной загрузке)
+        :return str: хэш
+        """
+        return hashlib.md5(json.dumps(
+            self.get_content(), separators=(',', ':')
+        ).encode()).hexdigest()
+
+    @abc.abstractmethod
+    def get_content(self):
+        """
+        Получение загружаемых данных объекта
+        :return list: данные в виде, пригодном для сериализации в JSON
+        """
+        pass
+
+    @classmethod
+    def bulk_create(cls, wrappers, batch_size=1000):
+        """
+        Запись новых объектов в БД (вместе со связанными объектами);
+        число запросов к БД не зависит от количества объектов
+        :param list(ObjectWrapper) wrappers: объекты ObjectWrapper
+        :param int batch_size: максимальное число строк в одном запросе
+        """
+        cls.MODEL_TYPE.objects.bulk_create(
+            [w.object_ for w in wrappers], batch_size=batch_size)
+        related_objects = dict()
+        for wrapper in wrappers:
+            for object_ in wrapper.get_related_objects():
+                related_objects.setdefault(type(object_), list()).append(object_)
+        for model_type, objects in related_objects.items():
+            model_type.objects.bulk_create(objects, batch_size=batch_size)
+
+    @classmethod
+    def bulk_upsert(cls, wrappers, batch_size=1000):
+        """
+        Запись новых и измененных объектов в БД (INSERT ... ON CONFLICT
+        по первичному ключу с перезаписью CONTENT_FIELDS и хэша данных);
+        существующие строки блокируются до конца текущей транзакции
+        и перезаписываются, только если выполнено условие
+        _upsert_condition; связанные объекты записанных объектов
+        перезаписываются целиком
+        :param list(ObjectWrapper) wrappers: объекты ObjectWrapper
+        :param int batch_size: максимальное число строк в одном запросе
+        :return list(int): id объектов, не перезаписанных из-за условия
+        """
+        qn = connection.ops.quote_name
+        meta = cls.MODEL_TYPE._meta
+        fields = list(meta.concrete_fields)
+        update_columns = [
+            meta.get_field(name).column
+            for name in cls.CONTENT_FIELDS + ('content_hash',)
+        ]
+        condition = cls._upsert_condition()
+        written_ids = set()
+        with connection.cursor() as cursor:
+            n_rows = max(min(batch_size, connection.ops.bulk_batch_size(
+                fields, wrappers)), 1)
+            for i in range(0, len(wrappers), n_rows):
+                batch = wrappers[i:i + n_rows]
+
+                # Блокировка существующих строк: условие проверяется
+                # следующим запросом, который видит изменения транзакций,
+                # зафиксированные до получения блокировки
+                list(cls.MODEL_TYPE.objects.select_for_update().filter(
+                    pk__in=[w.object_.pk for w in batch]
+                ).values_list('pk', flat=True))
+
+                row = '({0})'.format(', '.join(['%s'] * len(fields)))
+                cursor.execute(
+                    'INSERT INTO {0} ({1}) VALUES {2} '
+                    'ON CONFLICT ({3}) DO UPDATE SET {4}{5} '
+                    'RETURNING {3}'.format(
+                        qn(meta.db_table),
+                        ', '.join(qn(f.column) for f in fields),
+                        ', '.join([row] * len(batch)),
+                        qn(meta.pk.column),
+                        ', '.join('{0} = EXCLUDED.{0}'.format(qn(c)) for c in update_columns),
+                        '' if condition is None else ' WHERE ' + condition,
+                    ),
+                    [
+                        f.get_db_prep_save(getattr(w.object_, f.attname), connection)
+                        for w in batch for f in fields
+                    ],
+                )
+                written_ids.update(pk for pk, in cursor.fetchall())
+        written = [w for w in wrappers if w.object_.pk in written_ids]
+
+        # Связанные объекты измененных объектов
+        # (у новых объектов их еще нет)
+        ids = [w.object_.pk for w in written]
+        for name in cls.RELATED_SETS:
+            relation = meta.get_field(name[:-len('_set')])
+            for j in range(0, len(ids), batch_size):
+                relation.related_model.objects.filter(**{
+                    relation.field.name + '__in': ids[j:j + batch_size],
+                }).delete()
+
+        related_objects = dict()
+        for wrapper in written:
+            for object_ in wrapper.get_related_objects():
+                related_objects.setdefault(type(object_), list()).append(object_)
+        for model_type, objects in related_objects.items():
+            model_type.objects.bulk_create(objects, batch_size=batch_size)
+        return [w.object_.pk for w in wrappers if w.object_.pk not in written_ids]
+
+    @classmethod
+    def _upsert_condition(cls):
+        """
+        Условие перезаписи существующей строки при повторной загрузке
+        (SQL-выражение для ON CONFLICT ... DO UPDATE ... WHERE)
+        :return str | None: условие (None - строка перезаписывается всегда)
+        """
+        return None
+
+    @abc.abstractmethod
+    def get_related_objects(self):
+        """
+        Получение списка связанных объектов
+        :return list: связанные объекты
+        """
+        pass
+
     @abc.abstractmethod
     def save_related_objects(self, force_update=False):
         """
@@ -1,3 +1,6 @@
+from operator import attrgetter
+from django.db import connection
+from django.db.models import Q, Exists, OuterRef
 from ._object_wrapper import ObjectWrapper
 from .order_wrapper import OrderWrapper
 from .. import models
@@ -22,6 +25,14 @@ class CourierWrapper(ObjectWrapper):
     # Тип модели объекта
     MODEL_TYPE = models.Courier
 
+    # Имена связанных наборов объектов,
+    # загружаемых вместе с объектом
+    RELATED_SETS = ('region_set', 'interval_set')
+
+    # Имена полей объекта, перезаписываемых
+    # при повторной загрузке (upsert)
+    CONTENT_FIELDS = ('type',)
+
     def __init__(self, object_, select_related=False):
         """
         Инициализация
@@ -33,6 +44,14 @@ class CourierWrapper(ObjectWrapper):
         self.working_hours = list()
         super().__init__(object_, select_related)
 
+    @property
+    def working_hours_mask(self):
+        """
+        Получение битовой маски рабочих часов
+        :return int: битовая маска минут суток
+        """
+        return models.Interval.mask_of(self.working_hours)
+
     def select_related_objects(self):
         """
         Загрузка связанных объектов из БД
@@ -43,8 +62,8 @@ class CourierWrapper(ObjectWrapper):
         self.region_set = {
             r.number for r in self.regions
         }
-        self.working_hours = list(
-            self.object_.interval_set.all().order_by('min_time')
+        self.working_hours = sorted(
+            self.object_.interval_set.all(), key=attrgetter('min_time')
         )
 
     def clean_related_objects(self):
@@ -56,6 +75,42 @@ class CourierWrapper(ObjectWrapper):
         for interval in self.working_hours:
             interval.full_clean(exclude=['courier'])
 
+    def get_content(self):
+        """
+        Получение загружаемых данных объекта
+        :return list: данные в виде, пригодном для сериализации в JSON
+        """
+        return [
+            self.object_.type,
+            [r.number for r in self.regions],
+            [str(i) for i in self.working_hours],
+        ]
+
+    @classmethod
+    def _upsert_condition(cls):
+        """
+        Условие перезаписи существующей строки при повторной загрузке
+        (курьер без незавершенных развозов)
+        :return str: условие
+        """
+        qn = connection.ops.quote_name
+        courier_meta = models.Courier._meta
+        delivery_meta = models.Delivery._meta
+        return 'NOT EXISTS (SELECT 1 FROM {0} WHERE {0}.{1} = {2}.{3} AND NOT {0}.{4})'.format(
+            qn(delivery_meta.db_table),
+            qn(delivery_meta.get_field('courier').column),
+            qn(courier_meta.db_table),
+            qn(courier_meta.pk.column),
+            qn(delivery_meta.get_field('is_complete').column),
+        )
+
+    def get_related_objects(self):
+        """
+        Получение списка связанных объектов
+        :return list: связанные объекты
+        """
+        return self.regions + self.working_hours
+
     def save_related_objects(self, force_update=False):
         """
         Запись связанных объектов в БД
@@ -81,13 +136,57 @@ class CourierWrapper(ObjectWrapper):
             return False
 
         # Часы работы / доставки
-        match_working_hours = False
-        for working_interval in self.working_hours:
-            for delivery_interval in order_wrapper.delivery_hours:
-                if delivery_interval.intersects_with(working_interval):
-                    match_working_hours = True
-                    break
-        return match_working_hours
+        return (self.working_hours_mask &
+                order_wrapper.delivery_hours_mask) != 0
+
+    def select_candidate_orders(self):
+        """
+        Формирование запроса на выборку свободных заказов,
+        подходящих курьеру по району, часам доставки и весу
+        :return QuerySet: заказы, упорядоченные по весу
+        """
+        return CourierWrapper.select_common_candidate_orders([self])
+
+    @staticmethod
+    def select_common_candidate_orders(courier_wrappers):
+        """
+        Формирование запроса на выборку свободных заказов, районы, часы
+        доставки и вес которых подходят хотя бы одному из курьеров
+        (для нескольких курьеров условия проверяются независимо,
+        точное соответствие нужно проверять с помощью test_order)
+        :param list(CourierWrapper) courier_wrappers: данные по курьерам
+        :return QuerySet: заказы, упорядоченные по весу
+        """
+        region_set = set()
+        working_hours = set()
+        max_weight = None
+        for cw in courier_wrappers:
+            if len(cw.region_set) == 0 or len(cw.working_hours) == 0:
+                continue
+            region_set |= cw.region_set
+            working_hours |= {(i.min_time, i.max_time) for i in cw.working_hours}
+            if max_weight is None or cw.object_.max_weight > max_weight:
+                max_weight = cw.object_.max_weight
+
+        if max_weight is None:
+            return models.Order.objects.none()
+
+        # Пересечение часов доставки хотя бы с одним рабочим интервалом
+        match_working_hours = Q()
+        for min_time, max_time in sorted(working_hours):
+            match_working_hours |= Q(
+                min_time__lt=max_time,
+                max_time__gt=min_time,
+            )
+        delivery_hours = models.Interval.objects.filter(
+            match_working_hours, order=OuterRef('pk'))
+
+        return models.Order.objects.filter(
+            Exists(delivery_hours),
+            delivery=None,
+            region__in=region_set,
+            weight__lte=max_weight,
+        ).order_by('weight', 'id')
 
     def to_json_data(self):
         """
@@ -1,3 +1,5 @@
+from operator import attrgetter
+from django.db import connection
 from ._object_wrapper import ObjectWrapper
 from .. import models
 
@@ -21,6 +23,14 @@ class OrderWrapper(ObjectWrapper):
     # Тип модели объекта
     MODEL_TYPE = models.Order
 
+    # Имена связанных наборов объектов,
+    # загружаемых вместе с объектом
+    RELATED_SETS = ('interval_set',)
+
+    # Имена полей объекта, перезаписываемых
+    # при повторной загрузке (upsert)
+    CONTENT_FIELDS = ('weight', 'region')
+
     def __init__(self, object_, select_related=False):
         """
         Инициализация
@@ -30,11 +40,21 @@ class OrderWrapper(ObjectWrapper):
         self.delivery_hours = list()
         super().__init__(object_, select_related)
 
+    @property
+    def delivery_hours_mask(self):
+        """
+        Получение битовой маски часов доставки
+        :return int: битовая маска минут суток
+        """
+        return models.Interval.mask_of(self.delivery_hours)
+
     def select_related_objects(self):
         """
         Загрузка связанных объектов из БД
         """
-        self.delivery_hours = list(self.object_.interval_set.all().order_by('min_time'))
+        self.delivery_hours = sorted(
+            self.object_.interval_set.all(), key=attrgetter('min_time')
+        )
 
     def clean_related_objects(self):
         """
@@ -43,6 +63,36 @@ class OrderWrapper(ObjectWrapper):
         for interval in self.delivery_hours:
             interval.full_clean(exclude=['order'])
 
+    def get_content(self):
+        """
+        Получение загружаемых данных объекта
+        :return list: данные в виде, пригодном для сериализации в JSON
+        """
+        return [
+            '{0:.2f}'.format(self.object_.weight),
+            self.object_.region,
+            [str(i) for i in self.delivery_hours],
+        ]
+
+    @classmethod
+    def _upsert_condition(cls):
+        """
+        Условие перезаписи существующей строки при повторной загрузке
+        (заказ, не назначенный курьеру)
+        :return str: условие
+        """
+        qn = connection.ops.quote_name
+        meta = models.Order._meta
+        return '{0}.{1} IS NULL'.format(
+            qn(meta.db_table), qn(meta.get_field('delivery').column))
+
+    def get_related_objects(self):
+        """
+        Получение списка связанных объектов
+        :return list: связанные объекты
+        """
+        return list(self.delivery_hours)
+
     def save_related_objects(self, force_update=False):
         """
         Запись связанных объектов в БД